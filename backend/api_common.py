@@ -0,0 +1,221 @@
+# api_common.py
+"""
+Request validation and response bodies shared by the two REST servers, api_server.py
+(Flask, blocking) and asgi_server.py (Quart, async). Everything here works on plain dicts
+and raises ApiError for a bad request, so each server only adds its own I/O: reading the
+request, calling the sync or async pipeline, and turning results into responses.
+"""
+import json
+import os
+import config
+from modules.doc_processor import sniff_document_type
+from modules.doc_digest import load_cached_document, render_digest
+from modules.metrics import get_metrics_registry, llm_metrics_lines
+from modules.llm_client import get_llm_client
+from modules.job_queue import job_queue_metrics_lines
+from modules.report_jobs import get_report_job, report_file_path
+from modules.interview_session import QuestionGenerationError
+
+API_WARMUP_COMPONENTS = ['llm', 'jobs', 'docs', 'reports']
+
+class ApiError(Exception):
+    """A request the API rejects. `body` replaces the default {"error": message} payload."""
+
+    def __init__(self, message, status=400, body=None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+def error_response(e):
+    """Returns (payload, status) for an exception raised while handling a request."""
+    if isinstance(e, ApiError):
+        return (e.body if e.body is not None else {'error': str(e)}), e.status
+    if isinstance(e, QuestionGenerationError):
+        # The session was not saved, so the client can send the same answer again
+        return {'error': f'{e}. Please try again.', 'retryable': True}, 503
+    return {'error': str(e)}, 500
+
+def too_large_response():
+    return {'error': f'File is too large (limit is {config.MAX_UPLOAD_BYTES // (1024 * 1024)} MB)'}, 413
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def evaluation_event(sent, record):
+    """
+    SSE event for one record of a scored evaluation stream, given the prose already sent.
+    Partial records become `token` events with the newly rendered text (or a `replace` event
+    with the whole prose when it was rewritten, e.g. by the schema fallback); the record
+    carrying scores becomes `done`. Returns (event or None, prose sent).
+    """
+    text = record['evaluation']
+    if record['scores'] is not None:
+        return sse_event('done', {'evaluation': text, 'scores': record['scores']}), text
+    if text.startswith(sent):
+        delta = text[len(sent):]
+        return (sse_event('token', {'text': delta}) if delta else None), text
+    return sse_event('replace', {'text': text}), text
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # stops nginx-style proxies from buffering
+
+# --- Request validation ---
+
+def json_body(data):
+    """The request's JSON object; `data` is None when the body is missing or not valid JSON."""
+    if not isinstance(data, dict):
+        raise ApiError('A JSON object request body is required')
+    return data
+
+def document_text_from(data):
+    # Prefer the compact digest of an already processed document over the raw text. Reads
+    # the document cache, so async servers run it in a worker thread
+    cached_document = load_cached_document(data['document_id']) if data.get('document_id') else None
+    if cached_document:
+        return render_digest(cached_document['digest'])
+    return data.get('document_context') or data.get('document_text', '')
+
+def cached_session_document(data):
+    """
+    The already processed document a new session names by document_id, with its digest
+    rendered as the context, or None. Reads the document cache like document_text_from.
+    """
+    document = load_cached_document(data['document_id']) if data.get('document_id') else None
+    if document:
+        document['context'] = render_digest(document['digest'])
+    return document
+
+def question_request(data, document_text):
+    if not document_text:
+        raise ApiError('Document text is required')
+    return data.get('interview_type', 'Technical')
+
+def evaluation_request(data):
+    question, answer = data.get('question', ''), data.get('answer', '')
+    if not question or not answer:
+        raise ApiError('Both question and answer are required')
+    return question, answer
+
+def batch_request(data):
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError('A non-empty list of items is required')
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise ApiError(f'At most {config.BATCH_MAX_ITEMS} items can be evaluated per request')
+    return items
+
+def feedback_request(data):
+    interview_log = data.get('interview_log', '')
+    if not interview_log:
+        raise ApiError('Interview log is required')
+    return interview_log
+
+def report_request(data):
+    """Returns the interview_data for submit_report."""
+    q_and_a = data.get('q_and_a', [])
+    if not q_and_a:
+        raise ApiError('q_and_a with at least one question, answer and evaluation is required')
+    return {'name': data.get('name', 'N/A'), 'type': data.get('interview_type', 'N/A'), 'q_and_a': q_and_a}
+
+def upload_request(files):
+    """
+    Returns (file, extension, size) for the uploaded document, after checking its first
+    bytes against its extension. The stream is left at the start.
+    """
+    if 'file' not in files:
+        raise ApiError('No file provided')
+    file = files['file']
+    if file.filename == '':
+        raise ApiError('No file selected')
+    stream = file.stream
+    file_extension = sniff_document_type(stream.read(8), file.filename)
+    if file_extension is None:
+        raise ApiError('Unsupported or mislabeled file. Please upload a .pdf, .docx, .txt or .md file.', 415)
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return file, file_extension, size
+
+def session_request(data):
+    """Returns (interview_type, question_count, name) for a new session."""
+    try:
+        question_count = int(data.get('question_count', 5))
+    except (TypeError, ValueError):
+        question_count = None
+    if question_count is None or not 1 <= question_count <= config.MAX_QUESTION_COUNT:
+        raise ApiError(f'question_count must be a whole number from 1 to {config.MAX_QUESTION_COUNT}')
+    return data.get('interview_type', 'Technical'), question_count, data.get('name')
+
+def require_document(document):
+    if not document or 'error' in document:
+        raise ApiError('A valid document_id or document_text is required')
+    return document
+
+def require_session(session):
+    if session is None:
+        raise ApiError('Unknown or expired session', 404)
+    return session
+
+def answer_request(session, data):
+    if session.get('report_job_id'):
+        raise ApiError('This interview is already finished', 409)
+    answer = data.get('answer', '')
+    if not answer:
+        raise ApiError('Answer is required')
+    return answer
+
+# --- Response bodies ---
+
+def question_body(question, interview_type):
+    return {'question': question, 'interview_type': interview_type}
+
+def evaluation_body(result, question, answer):
+    return {'evaluation': result['evaluation'], 'scores': result['scores'], 'question': question, 'answer': answer}
+
+def document_body(document, filename):
+    if 'error' in document:
+        raise ApiError(document['error'])
+    return {'document_text': document['text'], 'document_id': document['hash'],
+            'document_context': document['context'], 'filename': filename}
+
+def session_summary(session):
+    return {
+        'session_id': session['session_id'],
+        'interview_type': session['interview_type'],
+        'question': session['current_question_text'],
+        'question_number': session['current_question_num'],
+        'question_count': session['question_count'],
+        'answered': len(session['interview_log']),
+        'report_job_id': session.get('report_job_id')
+    }
+
+def answer_body(session, evaluation, finished):
+    return {'evaluation': evaluation, 'scores': session['interview_log'][-1]['scores'],
+            'finished': finished, **session_summary(session)}
+
+def report_status(job_id):
+    job = get_report_job(job_id)
+    if job is None:
+        raise ApiError('Unknown report job', 404)
+    return job
+
+def report_download_path(job_id):
+    """Absolute path of a finished report; a report still being built is a 409 carrying its status."""
+    job = report_status(job_id)
+    file_path = report_file_path(job_id)
+    if file_path is None:
+        raise ApiError('Report is not ready', 409, body=job)
+    return os.path.abspath(file_path)
+
+def timings_body(session_id):
+    trace = get_metrics_registry().session_trace(session_id)
+    if trace is None:
+        raise ApiError('No timings recorded for this session', 404)
+    return {'session_id': session_id, 'turns': {str(turn): stages for turn, stages in trace.items()}}
+
+def metrics_body(extra_lines=()):
+    """Stage and LLM latency histograms plus LLM and job queue counters in the Prometheus text format."""
+    try:
+        llm_lines = llm_metrics_lines(get_llm_client().metrics.snapshot())
+    except Exception:
+        llm_lines = []  # the configured LLM backend could not be created, e.g. its package is missing
+    return get_metrics_registry().render_prometheus(llm_lines + job_queue_metrics_lines() + list(extra_lines))
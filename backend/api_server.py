@@ -1,105 +1,269 @@
 # api_server.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
+import sys
+import json
+import shutil
+import tempfile
 import config
-from modules.doc_processor import extract_text_from_document
-from modules.llm_handler import generate_question, evaluate_answer, generate_holistic_feedback
+from api_common import (API_WARMUP_COMPONENTS, ApiError, error_response, too_large_response, sse_event,
+                        evaluation_event,
+                        SSE_HEADERS, json_body, document_text_from, cached_session_document, question_request,
+                        evaluation_request, batch_request, feedback_request, report_request, upload_request,
+                        session_request, require_document, require_session, answer_request, question_body,
+                        evaluation_body, document_body, session_summary, answer_body, report_status,
+                        report_download_path, timings_body, metrics_body)
+from modules.doc_digest import process_document, process_document_bytes
+from modules.llm_handler import (generate_question, evaluate_answer_scored, generate_holistic_feedback,
+                                 stream_question, stream_evaluation_scored, stream_holistic_feedback)
+from modules.batch_evaluator import evaluate_batch
+from modules.web_search import prefetch_example_answers
+from modules.metrics import stage_timer, profile_if_slow
+from modules.report_jobs import submit_report
+from modules.warmup import start_warmup, get_warmup_status
+from modules.interview_session import (start_session, load_session, record_answer, is_finished,
+                                       advance_to_next_question, finish_session, end_session)
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_BYTES  # larger requests get a 413 before the body is read
 CORS(app)  # Enable CORS for all domains
 
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    body, status = too_large_response()
+    return jsonify(body), status
+
+@app.errorhandler(ApiError)
+def api_error(e):
+    return _error(e)
+
+def _error(e):
+    body, status = error_response(e)
+    return jsonify(body), status
+
+def _json_body():
+    return json_body(request.get_json(silent=True))
+
+def _sse_response(chunks, result_key, finish=None):
+    """
+    Streams LLM text as Server-Sent Events: one `token` event per chunk, then a `done`
+    event carrying the full text under `result_key` (plus any fields `finish(text)`
+    returns), or an `error` event.
+    """
+    def events():
+        text = ""
+        try:
+            for chunk in chunks:
+                text += chunk
+                yield sse_event('token', {'text': chunk})
+            yield sse_event('done', {result_key: text, **(finish(text) if finish else {})})
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def _sse_evaluation_response(records):
+    """Streams a scored evaluation: its prose as `token` events, then `done` with the validated scores."""
+    def events():
+        sent = ""
+        try:
+            for record in records:
+                event, sent = evaluation_event(sent, record)
+                if event:
+                    yield event
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @app.route('/api/generate-question', methods=['POST'])
 def api_generate_question():
     try:
-        data = request.get_json()
-        interview_type = data.get('interview_type', 'Technical')
-        document_text = data.get('document_text', '')
-        
-        if not document_text:
-            return jsonify({'error': 'Document text is required'}), 400
+        data = _json_body()
+        document_text = document_text_from(data)
+        interview_type = question_request(data, document_text)
         
         question = generate_question(interview_type, document_text)
+        prefetch_example_answers(question)
+        
+        return jsonify(question_body(question, interview_type))
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/generate-question/stream', methods=['POST'])
+def api_generate_question_stream():
+    try:
+        data = _json_body()
+        document_text = document_text_from(data)
+        interview_type = question_request(data, document_text)
         
-        return jsonify({
-            'question': question,
-            'interview_type': interview_type
-        })
+        return _sse_response(stream_question(interview_type, document_text), 'question',
+                             finish=lambda question: prefetch_example_answers(question) or {})
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error(e)
 
 @app.route('/api/evaluate-answer', methods=['POST'])
 def api_evaluate_answer():
     try:
-        data = request.get_json()
-        question = data.get('question', '')
-        answer = data.get('answer', '')
-        
-        if not question or not answer:
-            return jsonify({'error': 'Both question and answer are required'}), 400
+        question, answer = evaluation_request(_json_body())
+        result = evaluate_answer_scored(question, answer)
+        return jsonify(evaluation_body(result, question, answer))
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/evaluate-answer/stream', methods=['POST'])
+def api_evaluate_answer_stream():
+    try:
+        question, answer = evaluation_request(_json_body())
+        return _sse_evaluation_response(stream_evaluation_scored(question, answer))
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/evaluate-answers/batch', methods=['POST'])
+def api_evaluate_answers_batch():
+    """
+    Scores a list of {"question", "answer"} items. Results stream back as NDJSON, one line
+    per item in completion order, each carrying the item's `index` in the request.
+    """
+    try:
+        items = batch_request(_json_body())
         
-        evaluation = evaluate_answer(question, answer)
+        def lines():
+            for result in evaluate_batch(items):
+                yield json.dumps(result) + '\n'
         
-        return jsonify({
-            'evaluation': evaluation,
-            'question': question,
-            'answer': answer
-        })
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson', headers=SSE_HEADERS)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error(e)
 
 @app.route('/api/process-document', methods=['POST'])
 def api_process_document():
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        # Save the file temporarily
-        upload_folder = config.UPLOAD_FOLDER
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, file.filename)
-        file.save(file_path)
-        
-        # Extract text from document
-        document_text = extract_text_from_document(file_path)
+        # Reject anything whose first bytes don't match its extension before parsing it
+        file, file_extension, size = upload_request(request.files)
         
-        # Clean up the temporary file
-        os.remove(file_path)
+        # Extract text and digest (cached by content hash). Small uploads are parsed from
+        # memory; only large ones are spooled to a uniquely named temp file.
+        if size <= config.UPLOAD_SPOOL_THRESHOLD_BYTES:
+            document = process_document_bytes(file.stream.read(), file_extension)
+        else:
+            os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=config.UPLOAD_FOLDER, suffix=file_extension, delete=False) as tmp:
+                shutil.copyfileobj(file.stream, tmp)
+            try:
+                document = process_document(tmp.name)
+            finally:
+                os.remove(tmp.name)
         
-        if "Error" in document_text or "Unsupported" in document_text:
-            return jsonify({'error': document_text}), 400
-        
-        return jsonify({
-            'document_text': document_text,
-            'filename': file.filename
-        })
+        return jsonify(document_body(document, file.filename))
     
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error(e)
 
 @app.route('/api/holistic-feedback', methods=['POST'])
 def api_holistic_feedback():
     try:
-        data = request.get_json()
-        interview_log = data.get('interview_log', '')
+        feedback = generate_holistic_feedback(feedback_request(_json_body()))
+        return jsonify({'feedback': feedback})
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/holistic-feedback/stream', methods=['POST'])
+def api_holistic_feedback_stream():
+    try:
+        return _sse_response(stream_holistic_feedback(feedback_request(_json_body())), 'feedback')
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/reports', methods=['POST'])
+def api_create_report():
+    try:
+        job_id = submit_report(report_request(_json_body()))
+        return jsonify(report_status(job_id)), 202
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/reports/<job_id>', methods=['GET'])
+def api_report_status(job_id):
+    return jsonify(report_status(job_id))
+
+@app.route('/api/reports/<job_id>/download', methods=['GET'])
+def api_report_download(job_id):
+    return send_file(report_download_path(job_id), mimetype='application/pdf', as_attachment=True)
+
+@app.route('/api/sessions', methods=['POST'])
+def api_create_session():
+    try:
+        data = _json_body()
+        interview_type, question_count, name = session_request(data)
         
-        if not interview_log:
-            return jsonify({'error': 'Interview log is required'}), 400
+        # The document is either one already processed by /api/process-document or raw text
+        document = cached_session_document(data)
+        if not document and data.get('document_text'):
+            document = process_document_bytes(data['document_text'].encode('utf-8'), '.txt')
         
-        feedback = generate_holistic_feedback(interview_log)
+        session = start_session(interview_type, require_document(document), name, question_count)
+        return jsonify(session_summary(session)), 201
+    
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def api_get_session(session_id):
+    return jsonify(session_summary(require_session(load_session(session_id))))
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def api_delete_session(session_id):
+    end_session(session_id)
+    return '', 204
+
+@app.route('/api/sessions/<session_id>/answers', methods=['POST'])
+def api_session_answer(session_id):
+    try:
+        session = require_session(load_session(session_id))
+        answer = answer_request(session, _json_body())
+        
+        turn = session['current_question_num']
+        with stage_timer('turn', session_id, turn), profile_if_slow(f"turn_{session_id[:12]}_{turn}"):
+            evaluation = record_answer(session, answer)
+            finished = is_finished(session)
+            if finished:
+                finish_session(session)
+            else:
+                advance_to_next_question(session)
         
-        return jsonify({
-            'feedback': feedback
-        })
+        return jsonify(answer_body(session, evaluation, finished))
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _error(e)
+
+@app.route('/api/warmup', methods=['GET', 'POST'])
+def api_warmup():
+    if request.method == 'POST':
+        start_warmup(API_WARMUP_COMPONENTS)
+    return jsonify(get_warmup_status())
+
+@app.route('/api/sessions/<session_id>/timings', methods=['GET'])
+def api_session_timings(session_id):
+    """Seconds spent in each pipeline stage, per turn, for a recent session."""
+    return jsonify(timings_body(session_id))
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Stage and LLM latency histograms plus LLM and job queue counters in the Prometheus text format."""
+    return Response(metrics_body(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -110,5 +274,8 @@ if __name__ == '__main__':
     os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(config.REPORT_FOLDER, exist_ok=True)
     
+    if config.WARMUP_ON_START or '--warmup' in sys.argv:
+        start_warmup(API_WARMUP_COMPONENTS, delay=config.WARMUP_DELAY_SECONDS)
+    
     # Run the Flask server
     app.run(host='0.0.0.0', port=5000, debug=False)
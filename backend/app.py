@@ -1,98 +1,100 @@
 # app.py
 import gradio as gr
 import os
-import time
-import datetime
+import sys
 import random
 import config
-from modules.tts_handler import text_to_speech_file
-from modules.stt_handler import transcribe_audio
-from modules.doc_processor import extract_text_from_document
-from modules.llm_handler import generate_question, evaluate_answer
-from modules.report_generator import generate_pdf_report
+from modules.tts_handler import stream_speech_files
+from modules.stt_handler import stream_transcribe
+from modules.doc_digest import process_document
+from modules.interview_session import (start_session, load_session, stream_record_answer, is_finished,
+                                       advance_to_next_question, finish_session, QuestionGenerationError)
+from modules.report_jobs import wait_for_report
+from modules.warmup import start_warmup
+from modules.metrics import stage_timer, time_stage, profile_iterator_if_slow
 
 def start_interview(interview_type, doc_file, name, num_questions):
     if not interview_type or not doc_file:
-        return {
+        yield {
             chatbot: gr.update(value=[[None, "Please select an interview type and upload a document to begin."]]),
             audio_in: gr.update(interactive=False)
         }
-    doc_text = extract_text_from_document(doc_file.name)
-    if "Error" in doc_text or "Unsupported" in doc_text:
-        return {
-            chatbot: gr.update(value=[[None, f"Error: {doc_text}"]]),
+        return
+    document = process_document(doc_file.name)
+    if "error" in document:
+        yield {
+            chatbot: gr.update(value=[[None, f"Error: {document['error']}"]]),
             audio_in: gr.update(interactive=False)
         }
-    initial_state = {
-        "interview_type": interview_type,
-        "doc_text": doc_text,
-        "name": name if name else "User",
-        "question_count": int(num_questions),
-        "current_question_num": 1,
-        "interview_log": [],
-        "start_time": time.time()
-    }
-    first_question = generate_question(interview_type, doc_text)
-    initial_state["current_question_text"] = first_question
-    greeting = f"Hello {initial_state['name']}. We'll go through {int(num_questions)} questions today. Here is your first question:"
+        return
+    session = start_session(interview_type, document, name, num_questions)
+    first_question = session["current_question_text"]
+    greeting = f"Hello {session['name']}. We'll go through {int(num_questions)} questions today. Here is your first question:"
     tts_prompt = f"{greeting} {first_question}"
-    ai_voice_path = text_to_speech_file(tts_prompt)
-    return {
-        state: initial_state,
+    yield {
+        state: {"session_id": session["session_id"]},
         chatbot: gr.update(value=[[None, f"{greeting}\n\n{first_question}"]]),
-        audio_out: gr.update(value=ai_voice_path, autoplay=True),
         audio_in: gr.update(interactive=True),
         start_btn: gr.update(interactive=False)
     }
+    for ai_voice_chunk in stream_speech_files(tts_prompt):
+        yield {audio_out: ai_voice_chunk}
 
 def handle_interview_turn(user_audio, chatbot_history, current_state):
-    user_answer_text = transcribe_audio(user_audio)
-    chatbot_history.append([user_answer_text, None])
-    yield {chatbot: chatbot_history, audio_in: gr.update(interactive=False)}
+    session = load_session(current_state.get("session_id", ""))
+    if session is None:
+        chatbot_history.append([None, "This interview session has expired. Please start a new interview."])
+        yield {chatbot: chatbot_history, audio_in: gr.update(interactive=False), start_btn: gr.update(interactive=True)}
+        return
+
+    session_id, turn = session["session_id"], session["current_question_num"]
+    with stage_timer("turn", session_id, turn):
+        # Profiles the work between yields, not the streaming to the browser
+        yield from profile_iterator_if_slow(f"turn_{session_id[:12]}_{turn}",
+                                            _interview_turn(session, turn, user_audio, chatbot_history))
+
+def _interview_turn(session, turn, user_audio, chatbot_history):
+    session_id = session["session_id"]
+    chatbot_history.append(["...", None])
+    for partial in time_stage("stt", stream_transcribe(user_audio, owner=session_id), session_id, turn):
+        chatbot_history[-1][0] = partial["text"]
+        yield {chatbot: chatbot_history, audio_in: gr.update(interactive=False)}
+    user_answer_text = chatbot_history[-1][0]
     
-    evaluation_text = evaluate_answer(current_state["current_question_text"], user_answer_text)
-    current_state["interview_log"].append({
-        "question": current_state["current_question_text"],
-        "answer": user_answer_text,
-        "evaluation": evaluation_text
-    })
-    if current_state["current_question_num"] >= current_state["question_count"]:
+    # The evaluation is shown as it is generated rather than after the last token
+    chatbot_history.append([None, "..."])
+    for partial_evaluation in stream_record_answer(session, user_answer_text):
+        chatbot_history[-1][1] = partial_evaluation
+        yield {chatbot: chatbot_history}
+    if is_finished(session):
         end_message = "This concludes the interview. Generating your final report now."
         chatbot_history.append([None, end_message])
-        pdf_path = generate_pdf_file(current_state)
-        ai_voice_path = text_to_speech_file(end_message)
-        yield {
-            chatbot: chatbot_history,
-            audio_out: gr.update(value=ai_voice_path, autoplay=True),
-            download_pdf_btn: gr.update(value=pdf_path, visible=True)
-        }
+        yield {chatbot: chatbot_history}
+        # The report builds in the background while the closing message plays
+        report_job_id = finish_session(session)
+        for ai_voice_chunk in time_stage("tts", stream_speech_files(end_message), session_id, turn):
+            yield {audio_out: ai_voice_chunk}
+        with stage_timer("report_wait", session_id, turn):
+            pdf_path = wait_for_report(report_job_id)
+        yield {download_pdf_btn: gr.update(value=pdf_path, visible=True)}
     else:
-        current_state["current_question_num"] += 1
-        next_question = generate_question(current_state["interview_type"], current_state["doc_text"])
-        current_state["current_question_text"] = next_question
-        q_num = current_state["current_question_num"]
+        try:
+            next_question = advance_to_next_question(session)
+        except QuestionGenerationError as e:
+            # The answer was not saved, so recording it again retries the whole turn
+            print(f"💥 {e}")
+            chatbot_history.append([None, "Sorry, I couldn't prepare the next question. Please record your answer again."])
+            yield {chatbot: chatbot_history, audio_in: gr.update(interactive=True)}
+            return
+        q_num = session["current_question_num"]
         transition_message = f"Thank you. Here is question {q_num}:\n\n{next_question}"
         chatbot_history.append([None, transition_message])
-        ai_voice_path = text_to_speech_file(transition_message)
         yield {
-            state: current_state,
             chatbot: chatbot_history,
-            audio_out: gr.update(value=ai_voice_path, autoplay=True),
             audio_in: gr.update(interactive=True)
         }
-
-def generate_pdf_file(state):
-    total_duration_minutes = (time.time() - state.get("start_time", time.time())) / 60
-    final_data = { 
-        "name": state.get("name", "N/A"), 
-        "type": state.get("interview_type", "N/A"), 
-        "duration": total_duration_minutes,
-        "q_and_a": state.get("interview_log", [])
-    }
-    file_name = f"Report_{state.get('name', 'User')}_{datetime.datetime.now().strftime('%Y-%m-%d')}.pdf"
-    file_path = os.path.join(config.REPORT_FOLDER, file_name)
-    generate_pdf_report(final_data, file_path)
-    return file_path
+        for ai_voice_chunk in time_stage("tts", stream_speech_files(transition_message), session_id, turn):
+            yield {audio_out: ai_voice_chunk}
 
 with gr.Blocks(theme=gr.themes.Default()) as app:
     state = gr.State({})
@@ -106,8 +108,8 @@ with gr.Blocks(theme=gr.themes.Default()) as app:
             
             # --- THIS IS THE UPDATED COMPONENT ---
             doc_uploader = gr.File(
-                label="Upload Resume/CV (.pdf, .docx)",
-                file_types=['.pdf', '.docx']
+                label="Upload Resume/CV (.pdf, .docx, .txt, .md)",
+                file_types=['.pdf', '.docx', '.txt', '.md']
             )
             
             start_btn = gr.Button("Start Interview", variant="primary")
@@ -116,7 +118,7 @@ with gr.Blocks(theme=gr.themes.Default()) as app:
             chatbot = gr.Chatbot(label="Conversation", height=500)
             audio_in = gr.Audio(sources=["microphone"], type="filepath", label="Record Your Answer", interactive=False)
             download_pdf_btn = gr.File(label="Download Report", visible=False)
-            audio_out = gr.Audio(visible=False, autoplay=True)
+            audio_out = gr.Audio(visible=False, autoplay=True, streaming=True)
 
     start_btn.click(
         fn=start_interview,
@@ -127,10 +129,12 @@ with gr.Blocks(theme=gr.themes.Default()) as app:
     audio_in.stop_recording(
         fn=handle_interview_turn,
         inputs=[audio_in, chatbot, state],
-        outputs=[state, chatbot, audio_out, audio_in, download_pdf_btn]
+        outputs=[chatbot, audio_out, audio_in, download_pdf_btn, start_btn]
     )
 
 if __name__ == "__main__":
     os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(config.REPORT_FOLDER, exist_ok=True)
+    if config.WARMUP_ON_START or '--warmup' in sys.argv:
+        start_warmup(['llm', 'jobs', 'docs', 'reports', 'stt', 'tts'], delay=config.WARMUP_DELAY_SECONDS)
     app.launch(debug=True)
\ No newline at end of file
@@ -0,0 +1,374 @@
+# asgi_server.py
+"""
+Async serving mode for the REST API: the same routes as api_server.py on Quart, served
+by Hypercorn. Handlers await LLM calls on the shared LLM loop instead of holding a thread
+per request, so slow model round trips do not starve the server. LLM-backed routes go
+through admission control (429/503 under overload) and a request timeout (504), and
+SIGTERM drains in-flight requests before exiting.
+
+    python asgi_server.py                      # or: hypercorn asgi_server:app
+"""
+from quart import Quart, Response, request, jsonify, send_file, g
+from quart_cors import cors
+from werkzeug.exceptions import RequestEntityTooLarge
+import asyncio
+import functools
+import signal
+import os
+import sys
+import json
+import shutil
+import tempfile
+import config
+from api_common import (API_WARMUP_COMPONENTS, ApiError, error_response, too_large_response, sse_event,
+                        evaluation_event,
+                        SSE_HEADERS, json_body, document_text_from, cached_session_document, question_request,
+                        evaluation_request, batch_request, feedback_request, report_request, upload_request,
+                        session_request, require_document, require_session, answer_request, question_body,
+                        evaluation_body, document_body, session_summary, answer_body, report_status,
+                        report_download_path, timings_body, metrics_body)
+from modules.admission import AdmissionController, Overloaded
+from modules.doc_digest import aprocess_document, aprocess_document_bytes
+from modules.llm_handler import (agenerate_question, aevaluate_answer_scored, agenerate_holistic_feedback,
+                                 astream_question, astream_evaluation_scored, astream_holistic_feedback)
+from modules.batch_evaluator import aevaluate_batch
+from modules.web_search import prefetch_example_answers
+from modules.metrics import stage_timer
+from modules.llm_client import run_on_llm_loop, aiterate_on_llm_loop
+from modules.job_queue import get_job_queue
+from modules.report_jobs import submit_report
+from modules.warmup import start_warmup, get_warmup_status
+from modules.interview_session import (astart_session, aload_session, arecord_answer, is_finished,
+                                       aadvance_to_next_question, afinish_session, aend_session)
+
+app = cors(Quart(__name__))  # Enable CORS for all domains
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_BYTES
+app.config['RESPONSE_TIMEOUT'] = config.STREAM_TIMEOUT_SECONDS  # also bounds streamed bodies
+app.config['BODY_TIMEOUT'] = config.REQUEST_TIMEOUT_SECONDS
+
+_admission = None
+
+@app.before_serving
+async def startup():
+    global _admission
+    _admission = AdmissionController()  # created here so it belongs to the serving loop
+    os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(config.REPORT_FOLDER, exist_ok=True)
+    if config.WARMUP_ON_START or '--warmup' in sys.argv:
+        start_warmup(API_WARMUP_COMPONENTS, delay=config.WARMUP_DELAY_SECONDS)
+
+@app.errorhandler(RequestEntityTooLarge)
+async def upload_too_large(e):
+    body, status = too_large_response()
+    return jsonify(body), status
+
+@app.errorhandler(ApiError)
+async def api_error(e):
+    return _error(e)
+
+def _error(e):
+    body, status = error_response(e)
+    return jsonify(body), status
+
+def admitted(view):
+    """
+    Runs an expensive route under admission control and the request timeout. A streamed
+    response keeps its slot until the stream ends (see _hold_slot).
+    """
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        try:
+            await _admission.acquire()
+        except Overloaded as e:
+            return jsonify({'error': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+        g.admission_slot = True
+        try:
+            return await asyncio.wait_for(view(*args, **kwargs), config.REQUEST_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            _admission.record_timeout()
+            return jsonify({'error': 'The request timed out'}), 504
+        finally:
+            if g.pop('admission_slot', False):
+                _admission.release()
+    return wrapper
+
+def _hold_slot(chunks):
+    # Hands the request's admission slot over to _release_held_slot, which frees it once the
+    # whole request is over, including when the client disconnects before the body starts
+    if g.pop('admission_slot', False):
+        request.scope['admission.held_slot'] = True
+    return chunks
+
+def _release_held_slot(asgi_app):
+    """ASGI middleware: releases a slot kept by _hold_slot when the request's handling ends."""
+    async def wrapper(scope, receive, send):
+        try:
+            await asgi_app(scope, receive, send)
+        finally:
+            if scope.get('admission.held_slot'):
+                _admission.release()
+    return wrapper
+
+app.asgi_app = _release_held_slot(app.asgi_app)
+
+async def _json_body():
+    return json_body(await request.get_json(silent=True))
+
+def _sse_response(chunks, result_key, finish=None):
+    """Async counterpart of api_server._sse_response; `chunks` is iterated on the LLM loop."""
+    async def events():
+        text = ""
+        try:
+            async for chunk in aiterate_on_llm_loop(chunks):
+                text += chunk
+                yield sse_event('token', {'text': chunk})
+            yield sse_event('done', {result_key: text, **(finish(text) if finish else {})})
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(_hold_slot(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def _sse_evaluation_response(records):
+    """Async counterpart of api_server._sse_evaluation_response; `records` is iterated on the LLM loop."""
+    async def events():
+        sent = ""
+        try:
+            async for record in aiterate_on_llm_loop(records):
+                event, sent = evaluation_event(sent, record)
+                if event:
+                    yield event
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(_hold_slot(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+async def _question_input():
+    data = await _json_body()
+    document_text = await asyncio.to_thread(document_text_from, data)
+    return question_request(data, document_text), document_text
+
+@app.route('/api/generate-question', methods=['POST'])
+@admitted
+async def api_generate_question():
+    try:
+        interview_type, document_text = await _question_input()
+        question = await run_on_llm_loop(agenerate_question(interview_type, document_text))
+        prefetch_example_answers(question)
+        return jsonify(question_body(question, interview_type))
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/generate-question/stream', methods=['POST'])
+@admitted
+async def api_generate_question_stream():
+    try:
+        interview_type, document_text = await _question_input()
+        return _sse_response(astream_question(interview_type, document_text), 'question',
+                             finish=lambda question: prefetch_example_answers(question) or {})
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/evaluate-answer', methods=['POST'])
+@admitted
+async def api_evaluate_answer():
+    try:
+        question, answer = evaluation_request(await _json_body())
+        result = await run_on_llm_loop(aevaluate_answer_scored(question, answer))
+        return jsonify(evaluation_body(result, question, answer))
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/evaluate-answer/stream', methods=['POST'])
+@admitted
+async def api_evaluate_answer_stream():
+    try:
+        question, answer = evaluation_request(await _json_body())
+        return _sse_evaluation_response(astream_evaluation_scored(question, answer))
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/evaluate-answers/batch', methods=['POST'])
+@admitted
+async def api_evaluate_answers_batch():
+    """NDJSON results, one line per item in completion order, as in api_server."""
+    try:
+        items = batch_request(await _json_body())
+
+        async def lines():
+            async for result in aiterate_on_llm_loop(aevaluate_batch(items)):
+                yield json.dumps(result) + '\n'
+
+        return Response(_hold_slot(lines()), mimetype='application/x-ndjson', headers=SSE_HEADERS)
+
+    except Exception as e:
+        return _error(e)
+
+def _spool_upload(stream, file_extension):
+    """Copies a large upload to a temp file in UPLOAD_FOLDER and returns its path; run in a worker thread."""
+    os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=config.UPLOAD_FOLDER, suffix=file_extension, delete=False) as tmp:
+        shutil.copyfileobj(stream, tmp)
+    return tmp.name
+
+@app.route('/api/process-document', methods=['POST'])
+@admitted
+async def api_process_document():
+    try:
+        # Reject anything whose first bytes don't match its extension before parsing it
+        file, file_extension, size = upload_request(await request.files)
+
+        if size <= config.UPLOAD_SPOOL_THRESHOLD_BYTES:
+            document = await aprocess_document_bytes(file.stream.read(), file_extension)
+        else:
+            tmp_path = await asyncio.to_thread(_spool_upload, file.stream, file_extension)
+            try:
+                document = await aprocess_document(tmp_path)
+            finally:
+                await asyncio.to_thread(os.remove, tmp_path)
+
+        return jsonify(document_body(document, file.filename))
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/holistic-feedback', methods=['POST'])
+@admitted
+async def api_holistic_feedback():
+    try:
+        interview_log = feedback_request(await _json_body())
+        feedback = await run_on_llm_loop(agenerate_holistic_feedback(interview_log))
+        return jsonify({'feedback': feedback})
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/holistic-feedback/stream', methods=['POST'])
+@admitted
+async def api_holistic_feedback_stream():
+    try:
+        interview_log = feedback_request(await _json_body())
+        return _sse_response(astream_holistic_feedback(interview_log), 'feedback')
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/reports', methods=['POST'])
+async def api_create_report():
+    try:
+        job_id = await asyncio.to_thread(submit_report, report_request(await _json_body()))
+        return jsonify(report_status(job_id)), 202
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/reports/<job_id>', methods=['GET'])
+async def api_report_status(job_id):
+    return jsonify(report_status(job_id))
+
+@app.route('/api/reports/<job_id>/download', methods=['GET'])
+async def api_report_download(job_id):
+    return await send_file(report_download_path(job_id), mimetype='application/pdf', as_attachment=True)
+
+@app.route('/api/sessions', methods=['POST'])
+@admitted
+async def api_create_session():
+    try:
+        data = await _json_body()
+        interview_type, question_count, name = session_request(data)
+
+        # The document is either one already processed by /api/process-document or raw text
+        document = await asyncio.to_thread(cached_session_document, data)
+        if not document and data.get('document_text'):
+            document = await aprocess_document_bytes(data['document_text'].encode('utf-8'), '.txt')
+
+        session = await astart_session(interview_type, require_document(document), name, question_count)
+        return jsonify(session_summary(session)), 201
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+async def api_get_session(session_id):
+    return jsonify(session_summary(require_session(await aload_session(session_id))))
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+async def api_delete_session(session_id):
+    await aend_session(session_id)
+    return '', 204
+
+@app.route('/api/sessions/<session_id>/answers', methods=['POST'])
+@admitted
+async def api_session_answer(session_id):
+    try:
+        session = require_session(await aload_session(session_id))
+        answer = answer_request(session, await _json_body())
+
+        # profile_if_slow is not used here: its samplers cover threads, not interleaved tasks
+        with stage_timer('turn', session_id, session['current_question_num']):
+            evaluation = await arecord_answer(session, answer)
+            finished = is_finished(session)
+            if finished:
+                await afinish_session(session)
+            else:
+                await aadvance_to_next_question(session)
+
+        return jsonify(answer_body(session, evaluation, finished))
+
+    except Exception as e:
+        return _error(e)
+
+@app.route('/api/warmup', methods=['GET', 'POST'])
+async def api_warmup():
+    if request.method == 'POST':
+        start_warmup(API_WARMUP_COMPONENTS)
+    return jsonify(get_warmup_status())
+
+@app.route('/api/sessions/<session_id>/timings', methods=['GET'])
+async def api_session_timings(session_id):
+    return jsonify(timings_body(session_id))
+
+@app.route('/api/metrics', methods=['GET'])
+async def api_metrics():
+    """Same as api_server's metrics, plus admission control gauges and counters."""
+    return Response(metrics_body(_admission.metrics_lines()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    if _admission.draining:
+        return jsonify({'status': 'draining', 'message': 'AI Interview API is shutting down'}), 503
+    return jsonify({'status': 'healthy', 'message': 'AI Interview API is running'})
+
+async def serve(host=config.SERVER_HOST, port=config.SERVER_PORT):
+    """Serves until SIGINT/SIGTERM, then drains in-flight requests before closing."""
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config as HypercornConfig
+    hypercorn_config = HypercornConfig()
+    hypercorn_config.bind = [f"{host}:{port}"]
+    hypercorn_config.graceful_timeout = config.SHUTDOWN_GRACE_SECONDS
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async def shutdown_trigger():
+        await stop.wait()
+        # Still listening while draining, so late requests get a 503 rather than a refused connection
+        print("🛑 Shutting down: finishing in-flight requests")
+        await _admission.drain(config.SHUTDOWN_GRACE_SECONDS)
+
+    await hypercorn_serve(app, hypercorn_config, shutdown_trigger=shutdown_trigger)
+    get_job_queue().shutdown()
+
+def main(host=config.SERVER_HOST, port=config.SERVER_PORT):
+    # Process-wide, so it is set by this entry point rather than by anything importing the app
+    sys.setswitchinterval(config.SERVER_GIL_SWITCH_INTERVAL_SECONDS)
+    asyncio.run(serve(host, port))
+
+if __name__ == '__main__':
+    main()
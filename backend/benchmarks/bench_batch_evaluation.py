@@ -0,0 +1,87 @@
+# benchmarks/bench_batch_evaluation.py
+"""
+Answers scored per minute when re-scoring a recorded interview set: one evaluate_answer
+call at a time (today's per-pair API usage) versus evaluate_batch with and without
+packing short answers into one prompt. Uses the fake LLM backend with a latency model
+of 100 ms per call + 0.05 ms per prompt word + 0.5 ms per generated word.
+
+    python benchmarks/bench_batch_evaluation.py --items 60
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import llm_client, web_search  # noqa: E402
+from modules.llm_handler import evaluate_answer  # noqa: E402
+from modules.batch_evaluator import evaluate_batch  # noqa: E402
+
+EVALUATION = {
+    "scores": {"factual_accuracy": 7, "relevance_directness": 8, "structure_clarity": 6},
+    "strengths": "Clear example with a measurable outcome. " * 15,
+    "areas_for_improvement": "State the result before the detail. " * 15,
+    "example_rephrasing": "I cut onboarding time by 30% by removing two approval steps.",
+}
+
+def responder(prompt):
+    packed = prompt.count("**ANSWER ")
+    if packed:
+        return json.dumps({"evaluations": [{"number": i, **EVALUATION} for i in range(1, packed + 1)]})
+    return json.dumps(EVALUATION)
+
+def synthetic_items(count, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        words = rng.choice([40, 60, 80, 250])  # most recorded answers are short
+        items.append({"question": f"Tell me about a time you handled conflict #{i}.",
+                      "answer": " ".join(["I aligned the team on the goal and shipped."] * (words // 9))})
+    return items
+
+def install_fake_client():
+    backend = llm_client.FakeBackend(responder=responder)
+    original_generate = backend.generate
+
+    async def timed_generate(prompt, **options):
+        backend.latency = 0.1 + len(prompt.split()) * 0.00005 + len(responder(prompt).split()) * 0.0005
+        return await original_generate(prompt, **options)
+
+    backend.generate = timed_generate
+    llm_client.set_llm_client(llm_client.LLMClient(backend))
+    # Single evaluations look up example answers; keep that local and instant
+    web_search.set_search_enricher(web_search.SearchEnricher(web_search.FakeSearchProvider()))
+
+def run(label, items, score):
+    started = time.perf_counter()
+    done = score(items)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>22} | {done:>5} | {elapsed:>7.2f} | {done / elapsed * 60:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    install_fake_client()
+    items = synthetic_items(args.items)
+
+    def sequential(items):
+        return sum(1 for item in items if evaluate_answer(item["question"], item["answer"]))
+
+    def batched(pack_size):
+        def score(items):
+            results = list(evaluate_batch(items, max_concurrency=args.concurrency, pack_size=pack_size))
+            assert all(result.get("scores", {}).get("Factual Accuracy") == 7 for result in results), results
+            return len(results)
+        return score
+
+    print(f"{'mode':>22} | {'items':>5} | {'seconds':>7} | {'answers/min':>10}")
+    run("one call per answer", items, sequential)
+    run("batch, unpacked", items, batched(1))
+    run("batch, packed x4", items, batched(4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_doc_extraction.py
+"""
+Extraction time and peak RSS on synthetic 1, 50 and 500 page PDFs and DOCX files,
+comparing the previous `text += page.get_text()` loop with the streaming extractor.
+Each measurement runs in a fresh process so peak RSS is not shared between runs; the
+job queue's worker processes are warmed up first and the largest is reported separately.
+
+    python benchmarks/bench_doc_extraction.py --pages 1 50 500
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LINE = "Led a cross-functional team of 8 to ship a pricing experiment that lifted conversion by 4.2%. "
+
+def build_corpus(folder, pages):
+    import fitz
+    import docx
+    pdf_path = os.path.join(folder, f"resume_{pages}p.pdf")
+    with fitz.open() as doc:
+        for p in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(36, 36, 576, 756), f"Page {p + 1}\n" + (LINE + "\n") * 45, fontsize=9)
+        doc.save(pdf_path)
+
+    docx_path = os.path.join(folder, f"resume_{pages}p.docx")
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = "Jane Doe - Resume"
+    for p in range(pages):
+        for _ in range(40):
+            document.add_paragraph(LINE)
+        table = document.add_table(rows=3, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = "metric"
+    document.save(docx_path)
+    return [pdf_path, docx_path]
+
+def legacy_extract(file_path):
+    import fitz
+    import docx
+    text = ""
+    if file_path.endswith(".pdf"):
+        with fitz.open(file_path) as doc:
+            for page in doc:
+                text += page.get_text()
+    else:
+        doc = docx.Document(file_path)
+        for para in doc.paragraphs:
+            text += para.text + "\n"
+    return text
+
+def _run(mode, file_path, results):
+    import fitz  # noqa: F401  (imports are not part of the measurement)
+    import docx  # noqa: F401
+    from modules import doc_processor
+    from modules.job_queue import get_job_queue
+    extract = legacy_extract if mode == "legacy" else doc_processor.extract_text_from_document
+    if mode == "stream":
+        get_job_queue().warm_up()
+    started = time.perf_counter()
+    text = extract(file_path)
+    elapsed = time.perf_counter() - started
+    get_job_queue().shutdown()
+    # ru_maxrss is KiB on Linux; RUSAGE_CHILDREN is the largest pool worker once they have exited
+    own_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    results.put((elapsed, own_mb, worker_mb, len(text)))
+
+def measure(mode, file_path):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run, args=(mode, file_path, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 50, 500])
+    args = parser.parse_args()
+    print(f"{'document':>20} | {'legacy s':>8} | {'legacy MB':>9} | {'stream s':>8} | {'stream MB':>9} | {'worker MB':>9} | {'chars':>9}")
+    with tempfile.TemporaryDirectory() as folder:
+        for pages in args.pages:
+            for path in build_corpus(folder, pages):
+                legacy_s, legacy_mb, _, _ = measure("legacy", path)
+                stream_s, stream_mb, worker_mb, chars = measure("stream", path)
+                print(f"{os.path.basename(path):>20} | {legacy_s:>8.3f} | {legacy_mb:>9.1f} | {stream_s:>8.3f} | {stream_mb:>9.1f} | {worker_mb:>9.1f} | {chars:>9}")
+
+if __name__ == "__main__":
+    main()
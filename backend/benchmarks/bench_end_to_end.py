@@ -0,0 +1,314 @@
+# benchmarks/bench_end_to_end.py
+"""
+End-to-end interview benchmark against local fakes for the LLM (Gemini/Ollama), Piper,
+Whisper and DDGS, each with a log-normal latency distribution given as MEDIAN:P95
+seconds. Drives the Flask API (process-document, sessions, answers, report) and, when
+Gradio is installed, the app's start_interview / handle_interview_turn generators, at
+each concurrency level in a fresh process. Reports p50/p95/p99 turn latency, turns per
+second, peak RSS and the mean time per pipeline stage.
+
+    python benchmarks/bench_end_to_end.py --compare
+    python benchmarks/bench_end_to_end.py --save-baseline benchmarks/baselines/end_to_end.json
+
+--compare with no path checks against the committed baseline in benchmarks/baselines/,
+recorded with the default arguments on the host described in its "host" field. Timings
+depend on the machine, so regenerate it with the second command (same defaults) when
+comparing on different hardware or after an intended performance change.
+"""
+import argparse
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SAMPLE_RATE = 16000
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "end_to_end.json")
+RESUME = ("JANE DOE\nSenior Product Manager\n\nEXPERIENCE\nProduct Manager, Acme (2018-2024)\n"
+          + "- Led a pricing experiment that lifted conversion by 4%.\n" * 30 + "\nSKILLS\nSQL, experimentation, roadmapping\n")
+
+class LatencyDistribution:
+    """Log-normal latency with the given median and 95th percentile, from a seeded generator."""
+
+    def __init__(self, median, p95, seed):
+        self.median = median
+        self.sigma = math.log(p95 / median) / 1.645 if p95 > median > 0 else 0.0
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self.median <= 0:
+            return 0.0
+        with self._lock:
+            return self.median * math.exp(self.sigma * self.rng.gauss(0, 1))
+
+    @classmethod
+    def parse(cls, spec, seed):
+        median, _, p95 = spec.partition(":")
+        return cls(float(median), float(p95 or median), seed)
+
+# --- Fakes ---
+
+class FakeSynthesizer:
+    model_path = "fake-voice"
+    sample_rate = 22050
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def synthesize(self, text):
+        time.sleep(self.latency())
+        return b"\0\0" * int(self.sample_rate * len(text) * 0.06)
+
+class FakeWhisperModel:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def transcribe(self, audio, **kwargs):
+        time.sleep(self.latency())
+        return {"text": "I led the launch and measured activation weekly."}
+
+def fake_llm_responder():
+    questions = itertools.count(1)
+    evaluation = {
+        "scores": {"factual_accuracy": 7, "relevance_directness": 8, "structure_clarity": 6},
+        "strengths": "Clear example with a measurable outcome.",
+        "areas_for_improvement": "State the result before the detail.",
+        "example_rephrasing": "I cut onboarding time by 30% by removing two approval steps.",
+    }
+
+    def respond(prompt):
+        if "compact JSON" in prompt:
+            return json.dumps({"summary": "Product manager.", "skills": ["SQL"], "roles": [], "projects": []})
+        if '"evaluations"' in prompt:
+            return json.dumps({"evaluations": [{"number": i, **evaluation} for i in range(1, prompt.count("**ANSWER ") + 1)]})
+        if "JSON object" in prompt:
+            return json.dumps(evaluation)
+        if "You keep a running summary" in prompt:
+            return "Structured, concise answers with clear metrics; tends to state the result last."
+        if "career strategist" in prompt:
+            return "Overall Performance Summary: consistent, structured answers.\n- Action: quantify impact."
+        if "interview coach" in prompt:
+            return "Factual Accuracy: 7/10\nRelevance & Directness: 8/10\nStructure & Clarity (STAR Method): 6/10\nGood answer."
+        return f"Question {next(questions)}: which metric told you your last launch was working, and why?"
+
+    return respond
+
+def install_fakes(args):
+    from modules import llm_client, stt_handler, tts_handler, web_search
+    backend = llm_client.FakeBackend(latency=LatencyDistribution.parse(args.llm_latency, args.seed),
+                                     responder=fake_llm_responder(), token_delay=args.token_delay)
+    llm_client.set_llm_client(llm_client.LLMClient(backend))
+    tts_handler.set_synthesizer(FakeSynthesizer(LatencyDistribution.parse(args.tts_latency, args.seed + 1)))
+    whisper_latency = LatencyDistribution.parse(args.stt_latency, args.seed + 2)
+    stt_handler.set_stt_engine(stt_handler.STTEngine(model_loader=lambda size: FakeWhisperModel(whisper_latency)))
+    provider = web_search.FakeSearchProvider(latency=LatencyDistribution.parse(args.search_latency, args.seed + 3))
+    web_search.set_search_enricher(web_search.SearchEnricher(provider))
+
+def write_answer_wav(path, seconds=6):
+    """Tone bursts with pauses, so the VAD splits the answer into a few segments."""
+    import numpy as np
+    t = np.arange(SAMPLE_RATE * 2) / SAMPLE_RATE
+    speech = 0.3 * np.sin(2 * np.pi * 220 * t)
+    silence = np.zeros(SAMPLE_RATE)
+    audio = np.concatenate([np.concatenate([speech, silence]) for _ in range(max(1, seconds // 3))])
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((audio * 32767).astype(np.int16).tobytes())
+
+# --- Drivers: each runs one whole interview and returns its turn latencies ---
+
+def run_api_session(index, args, turn_latencies):
+    import api_server
+    client = api_server.app.test_client()
+    resume = f"{RESUME}\nCandidate {index}\n".encode("utf-8")  # distinct resumes, so the document cache is not hit
+    response = client.post("/api/process-document", data={"file": (io.BytesIO(resume), "resume.txt")},
+                           content_type="multipart/form-data")
+    document_id = response.get_json()["document_id"]
+    session = client.post("/api/sessions", json={"document_id": document_id, "interview_type": "Technical",
+                                                 "name": f"Candidate {index}", "question_count": args.questions}).get_json()
+    for _ in range(args.questions):
+        time.sleep(args.think_time)  # the candidate answering
+        started = time.perf_counter()
+        result = client.post(f"/api/sessions/{session['session_id']}/answers", json={"answer": "I led the launch."}).get_json()
+        turn_latencies.append(time.perf_counter() - started)
+    report_job_id = result["report_job_id"]
+    while client.get(f"/api/reports/{report_job_id}").get_json()["status"] in ("queued", "running"):
+        time.sleep(0.02)
+
+def run_gradio_session(index, args, turn_latencies):
+    import app
+    folder = tempfile.mkdtemp()
+    resume_path = os.path.join(folder, "resume.txt")
+    with open(resume_path, "w", encoding="utf-8") as f:
+        f.write(f"{RESUME}\nCandidate {index}\n")
+    doc_file = type("UploadedFile", (), {"name": resume_path})()
+    state = {}
+    for update in app.start_interview("Technical", doc_file, f"Candidate {index}", args.questions):
+        state = update.get(app.state, state)  # the greeting's audio is consumed, as the browser would
+    history = [[None, "Here is your first question"]]
+    answer_template = os.path.join(folder, "answer_template.wav")
+    write_answer_wav(answer_template)
+    for turn in range(args.questions):
+        time.sleep(args.think_time)
+        answer_path = os.path.join(folder, f"answer_{turn}.wav")  # handle_interview_turn deletes it
+        shutil.copy(answer_template, answer_path)
+        started = time.perf_counter()
+        for _ in app.handle_interview_turn(answer_path, history, state):
+            pass
+        turn_latencies.append(time.perf_counter() - started)
+    shutil.rmtree(folder, ignore_errors=True)
+
+DRIVERS = {"api": run_api_session, "gradio": run_gradio_session}
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def _run_scenario(mode, sessions, args, results):
+    """Runs in a fresh process: `sessions` interviews at once, all with fresh caches."""
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ.update({"LLM_BACKEND": "fake", "LLM_CACHE_ENABLED": "0", "SEARCH_PROVIDER": "fake", "SESSION_BACKEND": "memory"})
+    try:
+        install_fakes(args)
+        driver = DRIVERS[mode]
+        if mode == "gradio":
+            import app  # noqa: F401  (builds the Blocks UI; not part of the measurement)
+        else:
+            import api_server  # noqa: F401
+        turn_latencies, errors = [], []
+
+        def session(index):
+            try:
+                driver(index, args, turn_latencies)
+            except Exception as e:
+                errors.append(repr(e))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        from modules.metrics import get_metrics_registry
+        stage_means = {}
+        for key, histogram in get_metrics_registry()._histograms.items():
+            name, labels = key
+            if name == "interview_stage_seconds" and histogram.count:
+                stage_means[dict(labels)["stage"]] = round(histogram.total / histogram.count, 4)
+        results.put({
+            "turns": len(turn_latencies),
+            "errors": errors[:5],
+            "p50": percentile(turn_latencies, 50),
+            "p95": percentile(turn_latencies, 95),
+            "p99": percentile(turn_latencies, 99),
+            "turns_per_second": len(turn_latencies) / elapsed if elapsed else None,
+            "seconds": elapsed,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "stage_mean_seconds": stage_means,
+        })
+    except Exception as e:
+        results.put({"skipped": f"{type(e).__name__}: {e}"})
+    finally:
+        from modules.job_queue import get_job_queue
+        get_job_queue().shutdown()  # its worker processes would outlive os._exit
+        shutil.rmtree(workdir, ignore_errors=True)
+        os._exit(0)  # do not wait on pool and daemon threads left by the fakes
+
+def run_scenario(mode, sessions, args):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_scenario, args=(mode, sessions, args, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+def compare(results, baseline, tolerance):
+    """Prints the change against a baseline and returns the scenarios that regressed."""
+    regressions = []
+    print(f"\n{'scenario':>12} | {'p95 base':>8} | {'p95 now':>8} | {'turns/s base':>12} | {'turns/s now':>11} | verdict")
+    for name, now in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "p95" not in base or "p95" not in now:
+            continue
+        slower = now["p95"] > base["p95"] * (1 + tolerance)
+        fewer = now["turns_per_second"] < base["turns_per_second"] * (1 - tolerance)
+        verdict = "REGRESSION" if slower or fewer else "ok"
+        if slower or fewer:
+            regressions.append(name)
+        print(f"{name:>12} | {base['p95']:>8.3f} | {now['p95']:>8.3f} | {base['turns_per_second']:>12.2f} | "
+              f"{now['turns_per_second']:>11.2f} | {verdict}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=["api", "gradio"], choices=sorted(DRIVERS))
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="concurrent interviews")
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=0.5, help="seconds each candidate takes to answer")
+    parser.add_argument("--llm-latency", default="0.6:1.5", help="MEDIAN:P95 seconds per LLM call")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds per streamed token")
+    parser.add_argument("--tts-latency", default="0.15:0.3", help="MEDIAN:P95 seconds per synthesized sentence")
+    parser.add_argument("--stt-latency", default="0.2:0.5", help="MEDIAN:P95 seconds per transcribed segment")
+    parser.add_argument("--search-latency", default="0.5:1.5", help="MEDIAN:P95 seconds per web search")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE,
+                        help="compare against a baseline JSON file (default: the committed one); exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/throughput change before flagging")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scenario':>12} | {'turns':>5} | {'p50 s':>6} | {'p95 s':>6} | {'p99 s':>6} | {'turns/s':>7} | {'peak MB':>7} | slowest stages")
+    for mode in args.modes:
+        for sessions in args.sessions:
+            name = f"{mode}/{sessions}"
+            outcome = run_scenario(mode, sessions, args)
+            if "skipped" in outcome:
+                print(f"{name:>12} | skipped: {outcome['skipped']}")
+                break
+            results[name] = outcome
+            stages = sorted(outcome["stage_mean_seconds"].items(), key=lambda item: -item[1])[:3]
+            print(f"{name:>12} | {outcome['turns']:>5} | {outcome['p50']:>6.3f} | {outcome['p95']:>6.3f} | "
+                  f"{outcome['p99']:>6.3f} | {outcome['turns_per_second']:>7.2f} | {outcome['peak_rss_mb']:>7.1f} | "
+                  + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stages))
+            if outcome["errors"]:
+                print(f"{'':>12}   errors: {outcome['errors']}")
+
+    host = {"cpus": os.cpu_count(), "machine": platform.machine(), "python": platform.python_version()}
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "host": host, "config": vars(args), "results": results}
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nRegressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_holistic_feedback.py
+"""
+Size and latency of the end-of-interview holistic feedback call for interviews of
+increasing length, written from the whole Q&A log (as before) or from the session's
+running performance summary plus the answers it does not cover yet.
+
+Each interview runs through modules/interview_session with a fake LLM whose latency
+grows with the prompt (--base-latency plus --ms-per-word for every prompt word), the
+way model prefill does; the candidate takes --think-time seconds per answer, which is
+when the summary is updated.
+
+    python benchmarks/bench_holistic_feedback.py --questions 1 3 5 10
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_doc_extraction import LINE
+from bench_end_to_end import RESUME, fake_llm_responder
+
+def install_fake_llm(args):
+    from modules import llm_client
+
+    class PrefillBackend(llm_client.FakeBackend):
+        async def generate(self, prompt, json_mode=False):
+            await asyncio.sleep(args.base_latency + len(prompt.split()) * args.ms_per_word / 1000)
+            return await super().generate(prompt, json_mode)
+
+    llm_client.set_llm_client(llm_client.LLMClient(PrefillBackend(responder=fake_llm_responder())))
+
+def run_interview(questions, args):
+    """Runs one interview and returns the interview_data its report is built from."""
+    from modules import interview_session
+    document = {"hash": hashlib.sha256(RESUME.encode("utf-8")).hexdigest(), "context": RESUME}
+    session = interview_session.start_session("Product Sense", document, "Candidate", questions)
+    answer = LINE * args.answer_lines
+    while True:
+        time.sleep(args.think_time)
+        interview_session.record_answer(session, answer)
+        if interview_session.is_finished(session):
+            break
+        interview_session.advance_to_next_question(session)
+    return {"q_and_a": session["interview_log"], "performance_summary": session["performance_summary"],
+            "summarized_turns": session["summarized_turns"]}
+
+def time_feedback(log_text, summary=None):
+    from modules.llm_client import run_sync
+    from modules.llm_handler import agenerate_holistic_feedback, _holistic_feedback_prompt
+    started = time.perf_counter()
+    run_sync(agenerate_holistic_feedback(log_text, summary))
+    return time.perf_counter() - started, len(_holistic_feedback_prompt(log_text, summary).split())
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds the candidate takes per answer")
+    parser.add_argument("--answer-lines", type=int, default=12, help="sample lines per answer (~15 words each)")
+    parser.add_argument("--base-latency", type=float, default=0.4, help="seconds per LLM call")
+    parser.add_argument("--ms-per-word", type=float, default=0.5, help="extra milliseconds per prompt word")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    os.environ.update({"LLM_CACHE_ENABLED": "0", "SEARCH_ENRICHMENT_ENABLED": "0", "SESSION_BACKEND": "memory"})
+    install_fake_llm(args)
+    from modules.llm_handler import interview_log_text
+
+    print(f"{'questions':>9} | {'full log s':>10} | {'words':>6} | {'rolling s':>9} | {'words':>6} | {'summarized':>10}")
+    for questions in args.questions:
+        data = run_interview(questions, args)
+        q_and_a, summary, covered = data["q_and_a"], data["performance_summary"], data["summarized_turns"]
+        full_s, full_words = time_feedback(interview_log_text(q_and_a))
+        rolling_s, rolling_words = time_feedback(interview_log_text(q_and_a[covered:], covered + 1), summary or None)
+        print(f"{questions:>9} | {full_s:>10.2f} | {full_words:>6} | {rolling_s:>9.2f} | {rolling_words:>6} | "
+              f"{covered:>4} of {len(q_and_a):<3}")
+
+if __name__ == "__main__":
+    main()
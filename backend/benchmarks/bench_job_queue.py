@@ -0,0 +1,105 @@
+# benchmarks/bench_job_queue.py
+"""
+Latency of interactive CPU jobs (résumé PDF parsing, standing in for any per-turn job)
+while a backlog of report builds (radar chart plus the full PDF layout) runs in the same
+job queue, and the report throughput the queue sustains.
+
+  lanes  interactive jobs use the interactive lane, reports the background lane
+  fifo   everything goes through one lane, i.e. a plain shared process pool
+
+The whole report backlog is submitted at once, then interactive jobs arrive at a steady
+rate; each mode runs once per --workers value.
+
+    python benchmarks/bench_job_queue.py --workers 1 2 4 --reports 24 --interactive 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_doc_extraction import LINE
+from bench_end_to_end import percentile
+
+def build_resume(folder, pages=2):
+    import fitz
+    path = os.path.join(folder, "resume.pdf")
+    with fitz.open() as doc:
+        for p in range(pages):
+            doc.new_page().insert_textbox(fitz.Rect(36, 36, 576, 756), (LINE + "\n") * 45, fontsize=9)
+        doc.save(path)
+    return path
+
+def interview(questions=10):
+    evaluation = "Strong structure.\n" * 20 + "Structure: 7/10\nClarity: 8/10\n"
+    return {"name": "Candidate", "type": "Product Sense",
+            "q_and_a": [{"question": f"Question {i + 1}: how would you improve onboarding?",
+                         "answer": LINE * 6, "evaluation": evaluation} for i in range(questions)]}
+
+def _report(job_queue, lane, folder, index, chart_args):
+    from modules.report_generator import create_radar_chart, build_pdf_document
+    chart = job_queue.submit(create_radar_chart, *chart_args, lane=lane, kind="report_chart").result()
+    job_queue.submit(build_pdf_document, interview(), "Consistent answers.\n" * 30, chart,
+                     os.path.join(folder, f"report_{index}.pdf"), lane=lane, kind="report_pdf").result()
+
+def run(mode, workers, args, folder, resume):
+    from modules.job_queue import JobQueue
+    from modules.doc_processor import _pdf_pages_text
+    from modules.evaluation_schema import SCORE_CATEGORIES
+    job_queue = JobQueue(workers=workers, background_workers=max(1, workers - 1))
+    job_queue.warm_up()
+    # Load matplotlib and ReportLab in every worker so the first jobs are not measured cold
+    labels = [name.split(' (')[0] for name in SCORE_CATEGORIES.values()]
+    chart_args = (labels, [7.0] * len(labels))
+    for _ in range(workers):
+        _report(job_queue, "background", folder, "warm", chart_args)
+        job_queue.submit(_pdf_pages_text, resume, 0, 1).result()
+
+    interactive_lane = "interactive" if mode == "lanes" else "background"
+    report_threads = []
+    started = time.perf_counter()
+    for index in range(args.reports):
+        thread = threading.Thread(target=_report, args=(job_queue, "background", folder, index, chart_args))
+        thread.start()
+        report_threads.append(thread)
+
+    latencies = []
+    for _ in range(args.interactive):
+        submitted = time.perf_counter()
+        job_queue.submit(_pdf_pages_text, resume, 0, 2, lane=interactive_lane).result()
+        latencies.append(time.perf_counter() - submitted)
+        time.sleep(args.interval)
+    for thread in report_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    job_queue.shutdown()
+    return {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "max": max(latencies),
+            "reports_per_second": args.reports / elapsed}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", default=["fifo", "lanes"], choices=["fifo", "lanes"])
+    parser.add_argument("--reports", type=int, default=24, help="report builds in the backlog")
+    parser.add_argument("--interactive", type=int, default=40, help="interactive jobs measured")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between interactive jobs")
+    args = parser.parse_args()
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{cores} core(s) available")
+    print(f"{'mode':>5} | {'workers':>7} | {'interactive p50 s':>17} | {'p95 s':>6} | {'max s':>6} | {'reports/s':>9}")
+    with tempfile.TemporaryDirectory() as folder:
+        resume = build_resume(folder)
+        for workers in args.workers:
+            for mode in args.modes:
+                result = run(mode, workers, args, folder, resume)
+                print(f"{mode:>5} | {workers:>7} | {result['p50']:>17.3f} | {result['p95']:>6.3f} | "
+                      f"{result['max']:>6.3f} | {result['reports_per_second']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_question_prompt.py
+"""
+Measures prompt size and latency per generated question when the prompt carries the
+raw resume text versus the cached compact digest. Uses the fake LLM backend with a
+latency model of 40 ms + 0.05 ms per prompt token, so no API key is needed.
+
+    python benchmarks/bench_question_prompt.py --pages 1 3 8
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import llm_client  # noqa: E402
+from modules.llm_handler import generate_question  # noqa: E402
+from modules.doc_digest import render_digest, split_sections  # noqa: E402
+
+def approx_tokens(text):
+    return max(1, len(text) // 4)
+
+def synthetic_resume(pages):
+    blocks = ["JANE DOE\nSenior Product Manager\n", "SUMMARY\n" + "Product leader shipping B2B analytics. " * 8 + "\n"]
+    for i in range(pages * 3):
+        blocks.append(f"EXPERIENCE\nProduct Manager, Company {i} (2015-2020)\n"
+                      + "".join(f"- Led initiative {j} that grew activation by {j + 3}% across {i + 2} markets.\n" for j in range(12)))
+    blocks.append("SKILLS\n" + ", ".join(f"Skill {k}" for k in range(40)) + "\n")
+    return "\n".join(blocks)
+
+def digest_responder(prompt):
+    if "compact JSON" in prompt:
+        return json.dumps({
+            "summary": "Product leader shipping B2B analytics products.",
+            "skills": [f"Skill {k}" for k in range(15)],
+            "roles": [{"title": "Product Manager", "organization": f"Company {i}", "highlights": ["Grew activation"]} for i in range(5)],
+            "projects": [],
+        })
+    return "What was the hardest prioritization call you made at your last company?"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3, 8])
+    parser.add_argument("--questions", type=int, default=5)
+    args = parser.parse_args()
+
+    prompt_tokens = []
+    backend = llm_client.FakeBackend(responder=digest_responder)
+    original_generate = backend.generate
+
+    async def timed_generate(prompt, **options):
+        prompt_tokens.append(approx_tokens(prompt))
+        backend.latency = 0.04 + approx_tokens(prompt) * 0.00005
+        return await original_generate(prompt, **options)
+
+    backend.generate = timed_generate
+    llm_client.set_llm_client(llm_client.LLMClient(backend))
+
+    print(f"{'pages':>5} | {'raw tokens/q':>12} | {'raw ms/q':>8} | {'digest tokens/q':>15} | {'digest ms/q':>11}")
+    for pages in args.pages:
+        resume = synthetic_resume(pages)
+        digest = json.loads(digest_responder("compact JSON"))
+        digest["sections"] = split_sections(resume)
+        results = []
+        for context in (resume, render_digest(digest)):
+            prompt_tokens.clear()
+            latencies = []
+            for _ in range(args.questions):
+                started = time.perf_counter()
+                generate_question("Product Sense", context)
+                latencies.append((time.perf_counter() - started) * 1000)
+            results.append((statistics.mean(prompt_tokens), statistics.mean(latencies)))
+        (raw_tokens, raw_ms), (digest_tokens, digest_ms) = results
+        print(f"{pages:>5} | {raw_tokens:>12.0f} | {raw_ms:>8.1f} | {digest_tokens:>15.0f} | {digest_ms:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# benchmarks/bench_serving_capacity.py
+"""
+Capacity load test for the two ways of serving the REST API: api_server.py on the
+threaded Flask server (what `app.run` uses) and asgi_server.py on Hypercorn. Each server
+runs in its own process with the fake LLM and search provider from bench_end_to_end.
+Simulated candidates create a session and answer its questions over real HTTP with a
+think time between answers, at increasing numbers of concurrent sessions.
+
+A level passes when the p95 answer latency is within --slo seconds and fewer than 1% of
+requests fail; the largest passing level, divided by the cores available, is reported as
+concurrent sessions per core. Server peak RSS and thread count are sampled from /proc.
+
+    python benchmarks/bench_serving_capacity.py --sessions 16 64 256 --slo 3
+"""
+import argparse
+import asyncio
+import collections
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_end_to_end import RESUME, install_fakes, percentile
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _serve(server, port, args):
+    """Server process: fakes installed first, then the server runs until terminated."""
+    os.chdir(tempfile.mkdtemp())
+    os.environ.update({"LLM_BACKEND": "fake", "LLM_CACHE_ENABLED": "0", "SEARCH_PROVIDER": "fake", "SESSION_BACKEND": "memory"})
+    sys.stdout = open(os.devnull, "w")  # keep the table readable; the server logs every request
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    install_fakes(args)
+    from modules import llm_client
+    llm_client.set_llm_client(llm_client.LLMClient(llm_client.get_llm_client().backend, max_concurrency=args.llm_concurrency))
+    if server == "flask":
+        from werkzeug.serving import make_server
+        import api_server
+        make_server("127.0.0.1", port, api_server.app, threaded=True).serve_forever()
+    else:
+        import asgi_server
+        asgi_server.main("127.0.0.1", port)
+
+def _request(port, method, path, payload=None, timeout=120):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request(method, path, body=json.dumps(payload) if payload is not None else None,
+                           headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or b"null")
+    finally:
+        connection.close()
+
+async def _arequest(port, method, path, payload=None, timeout=120):
+    # A minimal HTTP/1.1 client: the load generator is one thread, so on a small machine it
+    # does not crowd the server out of CPU time the way one thread per candidate would
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        response = await asyncio.wait_for(reader.read(-1), timeout)
+    finally:
+        writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), json.loads(content or b"null")
+
+def _stage_totals(port, stage):
+    """(seconds, count) so far for one stage, from the server's /api/metrics."""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        connection.request("GET", "/api/metrics")
+        text = connection.getresponse().read().decode("utf-8")
+    finally:
+        connection.close()
+    totals = {}
+    for line in text.splitlines():
+        for field in ("sum", "count"):
+            if line.startswith(f'interview_stage_seconds_{field}{{stage="{stage}"}}'):
+                totals[field] = float(line.split()[-1])
+    return totals.get("sum", 0.0), totals.get("count", 0.0)
+
+def _wait_until_up(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if _request(port, "GET", "/api/health", timeout=2)[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+class _ProcSampler(threading.Thread):
+    """Samples a process's peak RSS, thread count and CPU time from /proc while a level runs."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak_threads = 0
+        self.peak_rss_mb = 0.0
+        self.cpu_seconds_at_start = self._cpu_seconds()
+        self.cpu_seconds = 0.0
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(0.1):
+            try:
+                with open(f"/proc/{self.pid}/status") as f:
+                    fields = dict(line.split(":", 1) for line in f if ":" in line)
+            except OSError:
+                return
+            self.peak_threads = max(self.peak_threads, int(fields["Threads"]))
+            self.peak_rss_mb = max(self.peak_rss_mb, int(fields["VmHWM"].split()[0]) / 1024)
+
+    def _cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")  # utime + stime
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.cpu_seconds = self._cpu_seconds() - self.cpu_seconds_at_start
+
+async def run_level(port, sessions, args):
+    latencies, statuses = [], collections.Counter()
+
+    async def candidate(index):
+        await asyncio.sleep(index * args.ramp / max(1, sessions))  # spread session starts over the ramp-up
+        try:
+            status, session = await _arequest(port, "POST", "/api/sessions", {
+                "document_text": f"{RESUME}\nCandidate {index}\n", "name": f"Candidate {index}",
+                "question_count": args.questions})
+            statuses[status] += 1
+            if status != 201:
+                return
+            for _ in range(args.questions):
+                await asyncio.sleep(args.think_time)
+                started = time.perf_counter()
+                status, _ = await _arequest(port, "POST", f"/api/sessions/{session['session_id']}/answers",
+                                            {"answer": "I led the launch."})
+                statuses[status] += 1
+                if status != 200:
+                    return
+                latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.TimeoutError) as e:
+            statuses[type(e).__name__] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(candidate(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    failed = sum(count for status, count in statuses.items() if status not in (200, 201))
+    total = sum(statuses.values())
+    return {
+        "p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+        "answers_per_second": len(latencies) / elapsed, "error_rate": failed / total if total else 1.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", nargs="+", default=["flask", "asgi"], choices=["flask", "asgi"])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[16, 64, 256], help="concurrent sessions per level")
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--think-time", type=float, default=2.0, help="seconds each candidate takes to answer")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which a level's sessions start")
+    parser.add_argument("--slo", type=float, default=3.0, help="p95 answer latency a level must stay within")
+    parser.add_argument("--llm-latency", default="0.6:1.5", help="MEDIAN:P95 seconds per LLM call")
+    parser.add_argument("--llm-concurrency", type=int, default=256, help="LLM calls the fake provider serves at once")
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--search-latency", default="0.5:1.5", help="MEDIAN:P95 seconds per web search")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+    args.tts_latency = args.stt_latency = "0:0"  # the REST API does no speech work
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    print(f"{cores} core(s) available")
+    print(f"{'server':>6} | {'sessions':>8} | {'p50 s':>6} | {'p95 s':>6} | {'answers/s':>9} | {'errors':>6} | {'threads':>7} | {'RSS MB':>6} | {'CPU ms/req':>10} | {'handler s':>9} | statuses")
+    for server in args.servers:
+        port = _free_port()
+        process = context.Process(target=_serve, args=(server, port, args), daemon=True)
+        process.start()
+        try:
+            _wait_until_up(port)
+            capacity = 0
+            for sessions in args.sessions:
+                sampler = _ProcSampler(process.pid)
+                sampler.start()
+                turn_seconds, turns = _stage_totals(port, "turn")
+                level = asyncio.run(run_level(port, sessions, args))
+                sampler.stop()
+                turn_seconds_after, turns_after = _stage_totals(port, "turn")
+                # Time the server spent inside the answer handler; the rest of the client's
+                # latency is connection handling and queueing in the server
+                level["server_turn_mean"] = (turn_seconds_after - turn_seconds) / max(1, turns_after - turns)
+                requests = sum(count for status, count in level["statuses"].items() if status.isdigit())
+                level.update(peak_threads=sampler.peak_threads, peak_rss_mb=sampler.peak_rss_mb,
+                             cpu_ms_per_request=1000 * sampler.cpu_seconds / max(1, requests))
+                results[f"{server}/{sessions}"] = level
+                passed = level["p95"] is not None and level["p95"] <= args.slo and level["error_rate"] < 0.01
+                if passed:
+                    capacity = sessions
+                p50 = f"{level['p50']:.2f}" if level["p50"] is not None else "-"
+                p95 = f"{level['p95']:.2f}" if level["p95"] is not None else "-"
+                print(f"{server:>6} | {sessions:>8} | {p50:>6} | {p95:>6} | {level['answers_per_second']:>9.1f} | "
+                      f"{level['error_rate']:>6.1%} | {level['peak_threads']:>7} | {level['peak_rss_mb']:>6.0f} | {level['cpu_ms_per_request']:>10.1f} | {level['server_turn_mean']:>9.2f} | "
+                      f"{level['statuses']}{'' if passed else '  (over SLO)'}")
+            results[f"{server}/capacity_per_core"] = capacity / cores
+            print(f"{server:>6} | capacity: {capacity} concurrent sessions within a {args.slo}s p95 "
+                  f"({capacity / cores:.0f} per core)")
+        finally:
+            process.terminate()
+            process.join(timeout=args.slo + 40)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"cores": cores, "config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of the API server: time to import api_server, time to serve the first
+/api/health request, and peak RSS at that point. Every run is a fresh interpreter.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, resource, time
+started = time.perf_counter()
+import api_server
+imported = time.perf_counter()
+response = api_server.app.test_client().get('/api/health')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    "import_s": imported - started,
+    "first_request_s": served - started,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    summary = {key: round(statistics.median(run[key] for run in runs), 3) for key in runs[0]}
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
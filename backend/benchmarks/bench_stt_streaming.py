@@ -0,0 +1,85 @@
+# benchmarks/bench_stt_streaming.py
+"""
+Compares time-to-final-transcript of the whole-file STT path against the streaming,
+VAD-segmented path on synthetic 1, 5 and 10 minute recordings.
+
+    python benchmarks/bench_stt_streaming.py            # real Whisper model
+    python benchmarks/bench_stt_streaming.py --fake     # fake model, ~0.05x real time
+    python benchmarks/bench_stt_streaming.py --fake --workers 2   # segments transcribed two at a time
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import stt_handler  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+class FakeWhisperModel:
+    def __init__(self, seconds_per_audio_second=0.05):
+        self.seconds_per_audio_second = seconds_per_audio_second
+
+    def transcribe(self, audio, **kwargs):
+        time.sleep(len(audio) / SAMPLE_RATE * self.seconds_per_audio_second)
+        return {"text": "word " * max(1, len(audio) // SAMPLE_RATE)}
+
+def write_synthetic_answer(path, minutes):
+    """Writes 8 s of tone-modulated noise followed by 2 s of silence, repeated, chunk by chunk."""
+    rng = np.random.default_rng(0)
+    t = np.arange(SAMPLE_RATE * 8) / SAMPLE_RATE
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        for _ in range(minutes * 6):
+            speech = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+            speech += 0.02 * rng.standard_normal(len(t))
+            silence = np.zeros(SAMPLE_RATE * 2)
+            wav.writeframes((np.concatenate([speech, silence]) * 32767).astype(np.int16).tobytes())
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fake", action="store_true", help="use a fake Whisper model")
+    parser.add_argument("--minutes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--workers", type=int, default=1, help="engine workers (segments transcribed at once)")
+    args = parser.parse_args()
+
+    loader = (lambda size: FakeWhisperModel()) if args.fake else stt_handler._load_whisper_model
+    engine = stt_handler.STTEngine(num_workers=args.workers, model_loader=loader)
+    engine.warm_up()
+
+    def whole_file(path):
+        audio = stt_handler.load_audio_for_whisper(path)
+        engine.transcribe_array(audio)
+
+    def streaming(path):
+        for _ in stt_handler.stream_transcribe(path, engine=engine, delete_after=False):
+            pass
+
+    print(f"{'length':>8} | {'whole-file s':>12} | {'whole MB':>9} | {'streaming s':>11} | {'stream MB':>9}")
+    for minutes in args.minutes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"answer_{minutes}m.wav")
+            write_synthetic_answer(path, minutes)
+            whole_s, whole_mb = measure(lambda: whole_file(path))
+            stream_s, stream_mb = measure(lambda: streaming(path))
+        print(f"{minutes:>6} m | {whole_s:>12.2f} | {whole_mb:>9.1f} | {stream_s:>11.2f} | {stream_mb:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_tts_first_audio.py
+"""
+Measures time-to-first-audio for the interview prompts: synthesizing the whole prompt
+into one file (previous behaviour) versus sentence-level streaming.
+
+    python benchmarks/bench_tts_first_audio.py          # real Piper voice
+    python benchmarks/bench_tts_first_audio.py --fake   # fake voice, 8 ms per character
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import tts_handler  # noqa: E402
+
+SAMPLE_QUESTION = ("Tell me about a product you launched from your resume. How did you decide what to build first, "
+                   "which metrics told you it was working, and what would you change if you did it again?")
+PROMPTS = {
+    "greeting": f"Hello Alex. We'll go through 5 questions today. Here is your first question: {SAMPLE_QUESTION}",
+    "transition": f"Thank you. Here is question 2:\n\n{SAMPLE_QUESTION}",
+    "closing": "This concludes the interview. Generating your final report now.",
+}
+
+class FakeSynthesizer:
+    model_path = "fake-voice"
+    sample_rate = 22050
+
+    def __init__(self, seconds_per_char=0.008):
+        self.seconds_per_char = seconds_per_char
+
+    def synthesize(self, text):
+        time.sleep(len(text) * self.seconds_per_char)
+        return b"\0\0" * int(self.sample_rate * len(text) * 0.06)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fake", action="store_true", help="use a fake synthesizer")
+    args = parser.parse_args()
+    if args.fake:
+        tts_handler.set_synthesizer(FakeSynthesizer())
+
+    print(f"{'prompt':>10} | {'whole-file first audio s':>24} | {'streaming first audio s':>23} | {'streaming total s':>17}")
+    for name, text in PROMPTS.items():
+        # A fresh cache per measurement, so neither path is served from disk
+        with tempfile.TemporaryDirectory() as tmp:
+            tts_handler._cache = tts_handler.TTSCache(tmp, output_folder=os.path.join(tmp, "out"))
+            started = time.perf_counter()
+            tts_handler.text_to_speech_file(text)
+            whole = time.perf_counter() - started
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tts_handler._cache = tts_handler.TTSCache(tmp, output_folder=os.path.join(tmp, "out"))
+            started = time.perf_counter()
+            first = None
+            for _ in tts_handler.stream_speech_files(text):
+                first = first or time.perf_counter() - started
+            total = time.perf_counter() - started
+        print(f"{name:>10} | {whole:>24.3f} | {first:>23.3f} | {total:>17.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,141 @@
 # config.py
 import os
 
+# -- LLM Configuration --
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')   # 'gemini', 'ollama' or 'fake'
+GEMINI_MODEL = 'gemini-pro'
+GEMINI_EMBEDDING_MODEL = 'models/text-embedding-004'   # only used by the cache's similarity tier
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')   # required when LLM_BACKEND is 'gemini'
+LLM_MAX_CONCURRENCY = 8          # LLM calls in flight across all sessions, for live turns
+LLM_BACKGROUND_MAX_CONCURRENCY = 4   # extra calls for background work (summaries, batch scoring), held back while live calls wait
+LLM_TIMEOUT_SECONDS = 60         # per attempt
+LLM_MAX_RETRIES = 2
+LLM_BACKOFF_BASE_SECONDS = 0.5
+EVAL_SCHEMA_RETRIES = 1          # repeat an evaluation whose JSON reply fails schema validation
+
+# -- LLM Response Cache Configuration --
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', '1') == '1'
+LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', 'llm_cache.db')   # '' keeps the cache in memory only
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+LLM_CACHE_MAX_ENTRIES = 5_000
+# Call types that may be served from the cache. Questions are left out: each session should
+# get fresh ones, and a cached question would repeat across candidates with the same resume
+LLM_CACHE_CALL_TYPES = ('evaluation', 'batch_evaluation')
+# Cosine similarity above which a near-duplicate prompt reuses a cached reply; None
+# (the default) disables the embedding tier and only exact prompts are matched
+LLM_CACHE_SIMILARITY_THRESHOLD = float(os.environ['LLM_CACHE_SIMILARITY']) if os.environ.get('LLM_CACHE_SIMILARITY') else None
+LLM_CACHE_SEMANTIC_CALL_TYPES = ('evaluation',)
+
 # -- Ollama Configuration --
 OLLAMA_MODEL = 'llama3.1' 
+OLLAMA_EMBEDDING_MODEL = 'nomic-embed-text'
+OLLAMA_HOST = os.environ.get('OLLAMA_HOST')
 
 # -- Interview Configuration --
 INTERVIEW_TYPES = ['Product Sense', 'Technical', 'General Product Interview', 'Group Discussion (GD)', 'Root case analysis']
 
 # -- Piper TTS Configuration --
 PIPER_VOICE_MODEL = './voice_model/en_US-lessac-medium.onnx' 
+TTS_NUM_WORKERS = 1                       # Piper voices kept loaded in memory
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024    # disk budget for cached utterances
+TTS_MIN_SENTENCE_CHARS = 20               # shorter fragments are merged into the next sentence
+TTS_STREAM_LOOKAHEAD = 2                  # sentences synthesized ahead of playback
+TTS_OUTPUT_TTL_SECONDS = 15 * 60          # how long audio handed to the UI stays on disk
+
+# -- Session Configuration --
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')   # 'memory', 'sqlite' or 'redis'
+SESSION_TTL_SECONDS = 4 * 60 * 60
+MAX_QUESTION_COUNT = 20    # questions a REST API session may ask (the Gradio slider stops at 10)
+SESSION_MAX_IN_MEMORY = 10_000
+SESSION_SQLITE_PATH = os.environ.get('SESSION_SQLITE_PATH', 'sessions.db')
+SESSION_REDIS_URL = os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+
+# -- Startup Configuration --
+# Components preloaded in the background after the server starts listening
+# (also enabled with --warmup). API server: llm, docs, reports. Gradio app: also stt, tts.
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '0') == '1'
+WARMUP_DELAY_SECONDS = 1.0
+
+# -- Async Serving Configuration (asgi_server.py) --
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '5000'))
+SERVER_MAX_IN_FLIGHT = int(os.environ.get('SERVER_MAX_IN_FLIGHT', '512'))   # LLM-backed requests worked on at once
+SERVER_MAX_QUEUED = int(os.environ.get('SERVER_MAX_QUEUED', '1024'))        # more may wait for a slot; beyond that, 429
+SERVER_QUEUE_TIMEOUT_SECONDS = 10     # a request that waited this long for a slot gets a 503
+REQUEST_TIMEOUT_SECONDS = 90          # JSON responses; slower requests are cancelled with a 504
+STREAM_TIMEOUT_SECONDS = 300          # whole streamed (SSE/NDJSON) responses
+SHUTDOWN_GRACE_SECONDS = 30           # on SIGTERM, time in-flight requests get to finish
+# The event loop thread gives up the GIL on every socket call; a shorter switch interval gets it
+# back sooner from CPU-bound threads in the same process (report builds, document parsing).
+# Process-wide, so only asgi_server.main() applies it
+SERVER_GIL_SWITCH_INTERVAL_SECONDS = 0.001
+
+# -- Metrics Configuration --
+METRICS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)   # histogram bounds in seconds
+METRICS_MAX_TRACED_SESSIONS = 1_000    # recent sessions whose per-turn stage timings are kept
+# Turns slower than this are profiled to PROFILE_FOLDER; None (the default) disables profiling
+PROFILE_SLOW_TURN_SECONDS = float(os.environ['PROFILE_SLOW_TURN_SECONDS']) if os.environ.get('PROFILE_SLOW_TURN_SECONDS') else None
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'stacks')   # 'stacks' (sampled, all threads) or 'cprofile' (calling thread)
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
 
 # -- Directories --
 UPLOAD_FOLDER = 'uploads'
-REPORT_FOLDER = 'reports'
\ No newline at end of file
+REPORT_FOLDER = 'reports'
+TTS_CACHE_FOLDER = 'tts_cache'
+TTS_OUTPUT_FOLDER = 'tts_output'   # links to cached utterances handed to the UI
+DOC_CACHE_FOLDER = 'doc_cache'
+PROFILE_FOLDER = 'profiles'
+
+# -- Document Extraction Configuration --
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024               # uploads above this are rejected with a 413
+UPLOAD_SPOOL_THRESHOLD_BYTES = 2 * 1024 * 1024    # larger uploads are parsed from a temp file
+DOC_MAX_PAGES = 200                    # pages read from a PDF, the rest is ignored
+DOC_MAX_CHARS = 500_000                # characters kept from any document
+DOC_PARALLEL_MIN_PAGES = 100           # PDFs on disk at least this long are split across the job queue's workers; shorter ones are parsed in place
+
+# -- Job Queue Configuration --
+# CPU-heavy stages (PDF parsing, report charts and PDF builds) run in one shared pool of
+# worker processes, Whisper in a separate one (STT_PROCESS_WORKERS); interactive jobs are
+# dispatched ahead of background ones.
+# There are at least two workers, even on one core, so a report build never holds the
+# only one and a turn's job starts at once (the OS shares the core between them)
+JOB_WORKERS = max(2, int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1)))
+JOB_BACKGROUND_WORKERS = JOB_WORKERS - 1   # workers report builds may hold; the rest stay free for turns
+
+# -- Report Configuration --
+REPORT_WORKERS = 2             # reports assembled at the same time (their CPU work runs in the job queue)
+REPORT_JOB_HISTORY = 256       # finished report jobs remembered for polling
+PERFORMANCE_SUMMARY_MAX_WORDS = 150   # running per-session summary the final feedback is written from
+
+# -- Batch Evaluation Configuration --
+BATCH_MAX_ITEMS = 500              # (question, answer) pairs accepted per batch request
+BATCH_MAX_CONCURRENCY = 4          # LLM calls one batch may have in flight; all batches share the background lane
+BATCH_PACK_SIZE = 4                # short answers evaluated together in one prompt (1 disables packing)
+BATCH_PACK_MAX_ANSWER_CHARS = 600  # answers longer than this always get their own prompt
+
+# -- Search Enrichment Configuration --
+# Opt-in: example answers found on the web are added to evaluation prompts when the lookup
+# (started as the question is asked) has already finished
+SEARCH_ENRICHMENT_ENABLED = os.environ.get('SEARCH_ENRICHMENT_ENABLED', '0') == '1'
+SEARCH_PROVIDER = os.environ.get('SEARCH_PROVIDER', 'ddgs')   # 'ddgs' or 'fake'
+SEARCH_NUM_RESULTS = 2
+SEARCH_TIMEOUT_SECONDS = 10            # per search request
+SEARCH_LATENCY_BUDGET_SECONDS = 0.0    # longest an evaluation waits for a lookup still in flight
+SEARCH_CACHE_TTL_SECONDS = 24 * 60 * 60
+SEARCH_NEGATIVE_TTL_SECONDS = 10 * 60  # failed or empty lookups are not retried for this long
+SEARCH_CACHE_MAX_ENTRIES = 2_000
+SEARCH_WORKERS = 4
+
+# -- Document Digest Configuration --
+DOC_DIGEST_MAX_CHARS = 2000    # cap on the resume context sent with every question prompt
+
+# -- Whisper STT Configuration --
+WHISPER_MODEL_SIZE = 'base'
+STT_NUM_WORKERS = 2        # transcriptions in flight
+STT_PROCESS_WORKERS = 2    # worker processes of the STT job queue; each keeps its own warm Whisper model
+STT_TORCH_THREADS = 1      # torch threads per STT worker, so concurrent transcriptions don't oversubscribe cores
+STT_QUEUE_SIZE = 8         # transcriptions allowed to wait for a free worker
+STT_TIMEOUT_SECONDS = 120
+STT_STREAM_WINDOW_SECONDS = 20     # longest speech segment sent to Whisper in streaming mode
+STT_STREAM_SILENCE_SECONDS = 0.6   # pause that closes a segment
+STT_VAD_ENERGY_THRESHOLD = 0.01    # RMS level (0-1) treated as speech
@@ -0,0 +1,95 @@
+# modules/admission.py
+import asyncio
+import collections
+import config
+
+class Overloaded(Exception):
+    """A request turned away by admission control, with the HTTP status to answer with."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounds the expensive requests an async server works on at once. Up to `max_in_flight`
+    run; up to `max_queued` more wait for a slot for at most `queue_timeout` seconds
+    (then 503), and any beyond that are rejected straight away with 429. Once draining
+    for shutdown, new requests get 503 and `drain()` waits for the in-flight ones.
+    All methods must be called from the server's event loop.
+    """
+
+    def __init__(self, max_in_flight=config.SERVER_MAX_IN_FLIGHT, max_queued=config.SERVER_MAX_QUEUED,
+                 queue_timeout=config.SERVER_QUEUE_TIMEOUT_SECONDS):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = collections.Counter()  # HTTP status -> count
+        self.timeouts = 0
+        self.draining = False
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def _reject(self, message, status, retry_after):
+        self.rejected[status] += 1
+        raise Overloaded(message, status, retry_after)
+
+    async def acquire(self):
+        """Waits for a slot; raises Overloaded when the request should be turned away instead."""
+        if self.draining:
+            self._reject("The server is shutting down", 503, 5)
+        if not self._slots.locked():
+            await self._slots.acquire()  # a free slot is taken without suspending
+        elif self.queued >= self.max_queued:
+            self._reject("Too many requests are waiting, please retry shortly", 429, 1)
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject("The server is overloaded, please retry shortly", 503, max(1, round(self.queue_timeout)))
+            finally:
+                self.queued -= 1
+        self.in_flight += 1
+        self._idle.clear()
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+        if self.in_flight == 0:
+            self._idle.set()
+
+    def record_timeout(self):
+        self.timeouts += 1
+
+    async def drain(self, timeout):
+        """Stops admitting requests and waits up to `timeout` seconds for the in-flight ones."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Shutdown grace period over with {self.in_flight} requests still in flight")
+
+    def metrics_lines(self):
+        """Current load and rejections in the Prometheus text format."""
+        lines = [
+            "# HELP server_in_flight_requests Admitted requests being worked on",
+            "# TYPE server_in_flight_requests gauge",
+            f"server_in_flight_requests {self.in_flight}",
+            "# HELP server_queued_requests Requests waiting for a slot",
+            "# TYPE server_queued_requests gauge",
+            f"server_queued_requests {self.queued}",
+            "# HELP server_rejected_requests_total Requests turned away by admission control",
+            "# TYPE server_rejected_requests_total counter",
+        ]
+        lines.extend(f'server_rejected_requests_total{{status="{status}"}} {self.rejected[status]}' for status in (429, 503))
+        lines += [
+            "# HELP server_request_timeouts_total Admitted requests cancelled by the request timeout",
+            "# TYPE server_request_timeouts_total counter",
+            f"server_request_timeouts_total {self.timeouts}",
+        ]
+        return lines
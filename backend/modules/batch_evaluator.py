@@ -0,0 +1,91 @@
+# modules/batch_evaluator.py
+import asyncio
+import config
+from modules.llm_client import iterate_sync
+from modules.llm_handler import aevaluate_answer_scored, aevaluate_packed_answers
+
+def _validate(item):
+    if not isinstance(item, dict):
+        return "Each item must be an object with a question and an answer"
+    if not str(item.get("question") or "").strip() or not str(item.get("answer") or "").strip():
+        return "Both question and answer are required"
+    return None
+
+def plan_batches(items, pack_size=config.BATCH_PACK_SIZE, pack_max_chars=config.BATCH_PACK_MAX_ANSWER_CHARS):
+    """
+    Groups item indexes into LLM calls: short answers are packed `pack_size` to a prompt,
+    long answers get a prompt of their own.
+    """
+    groups, short = [], []
+    for index, item in enumerate(items):
+        if pack_size > 1 and len(item["answer"]) <= pack_max_chars:
+            short.append(index)
+            if len(short) == pack_size:
+                groups.append(short)
+                short = []
+        else:
+            groups.append([index])
+    if short:
+        groups.append(short)
+    return groups
+
+async def aevaluate_batch(items, max_concurrency=config.BATCH_MAX_CONCURRENCY, pack_size=config.BATCH_PACK_SIZE,
+                          pack_max_chars=config.BATCH_PACK_MAX_ANSWER_CHARS):
+    """
+    Evaluates many {"question", "answer"} items and yields one result per item as soon as
+    it is ready, in completion order: {"index", "question", "answer", "evaluation", "scores"}
+    or {"index", "error"}. A failed item never fails the rest of the batch; a packed call
+    whose reply has no valid entry for an item falls back to evaluating that item alone.
+    Batch evaluations skip web search enrichment, so packed and single items are scored alike,
+    and run in the LLM client's background lane, so they never hold a slot a live turn needs.
+    """
+    results = asyncio.Queue()
+    valid = []
+    for index, item in enumerate(items):
+        error = _validate(item)
+        if error:
+            await results.put({"index": index, "error": error})
+        else:
+            valid.append((index, {"question": str(item["question"]), "answer": str(item["answer"])}))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def evaluate_one(index, item):
+        try:
+            async with semaphore:
+                evaluation = await aevaluate_answer_scored(item["question"], item["answer"], raise_errors=True, enrich=False,
+                                                           lane="background")
+            await results.put({"index": index, **item, **evaluation})
+        except Exception as e:
+            await results.put({"index": index, "error": f"An error occurred during evaluation: {e}"})
+
+    async def evaluate_group(group):
+        if len(group) == 1:
+            return await evaluate_one(*group[0])
+        try:
+            async with semaphore:
+                evaluations = await aevaluate_packed_answers([(item["question"], item["answer"]) for _, item in group],
+                                                             lane="background")
+        except Exception:
+            evaluations = [None] * len(group)
+        retry = []
+        for (index, item), evaluation in zip(group, evaluations):
+            if evaluation is None:
+                retry.append(evaluate_one(index, item))
+            else:
+                await results.put({"index": index, **item, **evaluation})
+        await asyncio.gather(*retry)
+
+    plan = plan_batches([item for _, item in valid], pack_size, pack_max_chars)
+    tasks = [asyncio.ensure_future(evaluate_group([valid[i] for i in group])) for group in plan]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        # Stop outstanding calls if the consumer stops reading, e.g. the client disconnected
+        for task in tasks:
+            task.cancel()
+
+def evaluate_batch(items, **options):
+    """Synchronous iterator over aevaluate_batch's results, for the Flask server and scripts."""
+    return iterate_sync(aevaluate_batch(items, **options))
@@ -0,0 +1,163 @@
+# modules/doc_digest.py
+import asyncio
+import hashlib
+import json
+import os
+import regex as re
+import config
+from modules.doc_processor import DocumentError, read_document_text
+from modules.llm_client import run_sync, run_on_llm_loop
+from modules.llm_handler import agenerate_document_digest
+from modules.metrics import stage_timer
+
+COMMON_HEADINGS = {
+    'summary', 'profile', 'objective', 'experience', 'work experience', 'professional experience',
+    'employment', 'education', 'skills', 'technical skills', 'projects', 'certifications',
+    'awards', 'achievements', 'publications', 'languages', 'interests', 'volunteering',
+}
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def split_sections(text):
+    """
+    Finds section headings (well-known resume headings or short all-caps lines) and
+    returns [{"title", "start", "end"}] character offsets into the text.
+    """
+    sections, offset = [], 0
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip().lstrip('#').strip().rstrip(':')
+        is_heading = (
+            0 < len(stripped) <= 40 and not stripped.endswith('.')
+            and (stripped.lower() in COMMON_HEADINGS or (stripped.isupper() and len(stripped.split()) <= 4))
+        )
+        if is_heading:
+            if sections:
+                sections[-1]["end"] = offset
+            sections.append({"title": stripped.title(), "start": offset, "end": len(text)})
+        offset += len(line)
+    return sections
+
+def _parse_json_reply(reply):
+    reply = reply.strip()
+    if reply.startswith("```"):
+        reply = re.sub(r"^```(?:json)?\s*|\s*```$", "", reply)
+    return json.loads(reply)
+
+async def _abuild_document_digest(text):
+    # Returns (digest, structured); structured is False for the text-excerpt fallback
+    digest = {"summary": "", "skills": [], "roles": [], "projects": [], "sections": split_sections(text)}
+    try:
+        parsed = _parse_json_reply(await agenerate_document_digest(text))
+        for key in ("summary", "skills", "roles", "projects"):
+            if key in parsed:
+                digest[key] = parsed[key]
+    except Exception as e:
+        print(f"💥 Could not build a structured digest, using a text excerpt instead: {e}")
+        digest["summary"] = text[:config.DOC_DIGEST_MAX_CHARS]
+        return digest, False
+    return digest, True
+
+async def abuild_document_digest(text):
+    """One LLM call turning the document into skills/roles/projects, plus local section boundaries."""
+    digest, _ = await _abuild_document_digest(text)
+    return digest
+
+def build_document_digest(text):
+    return run_sync(abuild_document_digest(text))
+
+def render_digest(digest, max_chars=config.DOC_DIGEST_MAX_CHARS):
+    """Renders a digest as the compact text fed into question prompts."""
+    lines = []
+    if digest.get("summary"):
+        lines.append(f"Summary: {digest['summary']}")
+    if digest.get("skills"):
+        lines.append(f"Skills: {', '.join(map(str, digest['skills']))}")
+    for role in digest.get("roles", []):
+        where = f" at {role.get('organization')}" if role.get('organization') else ""
+        lines.append(f"Role: {role.get('title', '')}{where} - {'; '.join(role.get('highlights', []))}")
+    for project in digest.get("projects", []):
+        lines.append(f"Project: {project.get('name', '')} - {'; '.join(project.get('highlights', []))}")
+    if digest.get("sections"):
+        lines.append(f"Sections: {', '.join(s['title'] for s in digest['sections'])}")
+    return "\n".join(lines)[:max_chars]
+
+def _cache_path(doc_hash):
+    return os.path.join(config.DOC_CACHE_FOLDER, f"{doc_hash}.json")
+
+def load_cached_document(doc_hash):
+    if not re.fullmatch(r"[0-9a-f]{64}", doc_hash or ""):
+        return None
+    try:
+        with open(_cache_path(doc_hash), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_cached_document(record):
+    os.makedirs(config.DOC_CACHE_FOLDER, exist_ok=True)
+    tmp_path = f"{_cache_path(record['hash'])}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    os.replace(tmp_path, _cache_path(record['hash']))
+
+def _process(doc_hash, extract):
+    record = load_cached_document(doc_hash)
+    if record:
+        print(f"📄 Document cache hit for {doc_hash[:12]}")
+    else:
+        try:
+            with stage_timer("document_extraction"):
+                text = extract()
+        except DocumentError as e:
+            return {"error": str(e)}
+        with stage_timer("document_digest"):
+            digest, structured = run_sync(_abuild_document_digest(text))
+        record = {"hash": doc_hash, "text": text, "digest": digest}
+        if structured:
+            # A fallback excerpt is not cached, so the next upload asks the model again
+            _save_cached_document(record)
+    record["context"] = render_digest(record["digest"])
+    return record
+
+async def _aprocess(doc_hash, extract):
+    # Same as _process, for async servers: cache reads and writes and extraction run in
+    # worker threads and the digest call is awaited on the LLM loop, so no thread waits on the model
+    record = await asyncio.to_thread(load_cached_document, doc_hash)
+    if record:
+        print(f"📄 Document cache hit for {doc_hash[:12]}")
+    else:
+        try:
+            with stage_timer("document_extraction"):
+                text = await asyncio.to_thread(extract)
+        except DocumentError as e:
+            return {"error": str(e)}
+        with stage_timer("document_digest"):
+            digest, structured = await run_on_llm_loop(_abuild_document_digest(text))
+        record = {"hash": doc_hash, "text": text, "digest": digest}
+        if structured:
+            await asyncio.to_thread(_save_cached_document, record)
+    record["context"] = render_digest(record["digest"])
+    return record
+
+def process_document(file_path):
+    """
+    Returns {"hash", "text", "digest", "context"} for an uploaded document. The extracted
+    text and digest are cached on disk by file hash, so re-uploading the same resume
+    skips extraction and the digest call. Returns {"error": ...} when extraction fails.
+    """
+    return _process(file_sha256(file_path), lambda: read_document_text(file_path))
+
+def process_document_bytes(data, file_extension):
+    """Same as process_document, for a document held in memory."""
+    return _process(hashlib.sha256(data).hexdigest(), lambda: read_document_text(data, file_extension))
+
+async def aprocess_document(file_path):
+    return await _aprocess(await asyncio.to_thread(file_sha256, file_path), lambda: read_document_text(file_path))
+
+async def aprocess_document_bytes(data, file_extension):
+    return await _aprocess(hashlib.sha256(data).hexdigest(), lambda: read_document_text(data, file_extension))
@@ -1,29 +1,171 @@
 # modules/doc_processor.py
 
-import fitz  # PyMuPDF for PDFs
-import docx  # python-docx for DOCX files
+# PyMuPDF (fitz) and python-docx are imported inside the extractors, on first use
+import io
 import os
+import config
+from modules.job_queue import get_job_queue
 
-def extract_text_from_document(file_path):
+UNSUPPORTED_FORMAT_MESSAGE = "Unsupported file format. Please upload a .pdf, .docx, .txt or .md file."
+
+class DocumentError(ValueError):
+    """The document's format is not supported or its text could not be read."""
+
+def _pdf_pages_text(source, start, stop):
+    """Runs in a job queue worker: returns the text of pages [start, stop)."""
+    import fitz
+    with (fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype='pdf')) as doc:
+        return [doc.load_page(i).get_text() for i in range(start, stop)]
+
+def iter_pdf_text(source, max_pages=config.DOC_MAX_PAGES):
     """
-    Extracts text from a given document (PDF or DOCX).
+    Yields PDF text one page at a time. `source` is a path or the file's bytes. PDFs on
+    disk of at least DOC_PARALLEL_MIN_PAGES pages are split into page ranges across the
+    job queue's workers; anything smaller is read from the document already open here,
+    since sending it to a worker costs more than parsing it.
     """
-    text = ""
+    import fitz
+    is_path = isinstance(source, str)
+    with (fitz.open(source) if is_path else fitz.open(stream=source, filetype='pdf')) as doc:
+        page_count = min(doc.page_count, max_pages)
+        if not is_path or page_count < config.DOC_PARALLEL_MIN_PAGES:
+            for i in range(page_count):
+                yield doc.load_page(i).get_text()
+            return
+
+    job_queue = get_job_queue()
+    step = max(1, -(-page_count // job_queue.workers))
+    jobs = [job_queue.submit(_pdf_pages_text, source, start, min(start + step, page_count), kind="pdf_parse")
+            for start in range(0, page_count, step)]
     try:
-        _, file_extension = os.path.splitext(file_path)
-
-        if file_extension.lower() == '.pdf':
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    text += page.get_text()
-        elif file_extension.lower() == '.docx':
-            doc = docx.Document(file_path)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
+        for job in jobs:
+            yield from job.result()
+    finally:
+        for job in jobs:
+            job.cancel()  # the reader stopped early, e.g. at max_chars
+
+def _run_content_tags(qn):
+    # Text nodes plus the run-level breaks Paragraph.text also turns into whitespace
+    return {qn('w:t'): None, qn('w:tab'): "\t", qn('w:br'): "\n", qn('w:cr'): "\n"}
+
+def _paragraph_text(p_element, content_tags):
+    # Walking the run content nodes directly is several times faster than Paragraph.text's xpath
+    pieces = []
+    for node in p_element.iter(*content_tags):
+        whitespace = content_tags[node.tag]
+        pieces.append(node.text or "" if whitespace is None else whitespace)
+    return "".join(pieces)
+
+def _cell_text(cell, qn, content_tags):
+    # Only the cell's own paragraphs and tables: iterating every descendant w:p would
+    # repeat the text of a nested table after the nested table itself
+    for block in cell.iterchildren(qn('w:p'), qn('w:tbl')):
+        if block.tag == qn('w:p'):
+            yield _paragraph_text(block, content_tags)
         else:
-            return "Unsupported file format. Please upload a .pdf or .docx file."
-    
+            yield "".join(_table_text(block, qn, content_tags)).rstrip("\n")
+
+def _table_text(tbl_element, qn, content_tags):
+    for row in tbl_element.iterchildren(qn('w:tr')):
+        cells = ("\n".join(_cell_text(cell, qn, content_tags)) for cell in row.iterchildren(qn('w:tc')))
+        yield " | ".join(cells) + "\n"
+
+def iter_docx_text(source):
+    """Yields DOCX headers, then body paragraphs and tables in document order."""
+    import docx
+    from docx.oxml.ns import qn
+    doc = docx.Document(source if isinstance(source, str) else io.BytesIO(source))
+    content_tags = _run_content_tags(qn)
+    seen_headers = set()
+    for section in doc.sections:
+        for para in section.header.paragraphs:
+            if para.text and para.text not in seen_headers:
+                seen_headers.add(para.text)
+                yield para.text + "\n"
+
+    for block in doc.element.body.iterchildren():
+        if block.tag == qn('w:p'):
+            yield _paragraph_text(block, content_tags) + "\n"
+        elif block.tag == qn('w:tbl'):
+            yield from _table_text(block, qn, content_tags)
+
+def iter_plain_text(source, chunk_size=64 * 1024):
+    if isinstance(source, str):
+        f = open(source, encoding='utf-8', errors='replace')
+    else:
+        f = io.TextIOWrapper(io.BytesIO(source), encoding='utf-8', errors='replace')
+    with f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            yield chunk
+
+EXTRACTORS = {
+    '.pdf': iter_pdf_text,
+    '.docx': iter_docx_text,
+    '.txt': iter_plain_text,
+    '.md': iter_plain_text,
+    '.markdown': iter_plain_text,
+}
+
+def sniff_document_type(head, filename):
+    """
+    Checks the first bytes of an upload against its extension. Returns the extension
+    when they agree, otherwise None.
+    """
+    _, file_extension = os.path.splitext(filename or '')
+    file_extension = file_extension.lower()
+    if file_extension == '.pdf':
+        return file_extension if head.startswith(b'%PDF-') else None
+    if file_extension == '.docx':
+        return file_extension if head.startswith(b'PK\x03\x04') else None
+    if file_extension in EXTRACTORS:
+        return file_extension if b'\x00' not in head else None
+    return None
+
+def iter_document_text(source, file_extension=None, max_chars=config.DOC_MAX_CHARS):
+    """
+    Yields the document's text in pieces, stopping once max_chars have been produced.
+    `source` is a file path, or the file's bytes together with its extension.
+    """
+    if file_extension is None:
+        _, file_extension = os.path.splitext(source)
+    extractor = EXTRACTORS[file_extension.lower()]
+    remaining = max_chars
+    for piece in extractor(source):
+        if len(piece) >= remaining:
+            yield piece[:remaining]
+            return
+        remaining -= len(piece)
+        yield piece
+
+def read_document_text(source, file_extension=None):
+    """
+    Returns the text of a document (PDF, DOCX, TXT or Markdown) given as a path, or as
+    bytes together with its extension. Raises DocumentError when it cannot be read.
+    """
+    if file_extension is None:
+        _, file_extension = os.path.splitext(source)
+    if file_extension.lower() not in EXTRACTORS:
+        raise DocumentError(UNSUPPORTED_FORMAT_MESSAGE)
+    try:
+        return "".join(iter_document_text(source, file_extension))
     except Exception as e:
-        return f"Error reading document: {e}"
+        raise DocumentError(f"Error reading document: {e}") from e
 
-    return text
\ No newline at end of file
+def extract_text_from_document(file_path):
+    """
+    Extracts text from a given document (PDF, DOCX, TXT or Markdown). Failures are
+    returned as the error message; use read_document_text to tell them apart.
+    """
+    try:
+        return read_document_text(file_path)
+    except DocumentError as e:
+        return str(e)
+
+def extract_text_from_bytes(data, file_extension):
+    """
+    Extracts text from an in-memory document, e.g. an upload that was never written to disk.
+    """
+    try:
+        return read_document_text(data, file_extension)
+    except DocumentError as e:
+        return str(e)
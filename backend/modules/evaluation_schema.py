@@ -0,0 +1,111 @@
+# modules/evaluation_schema.py
+import json
+import regex as re
+
+# Evaluations are requested as JSON, checked against this schema and stored as typed
+# score records ({category: int or None}) next to the prose rendered from them.
+
+SCORE_CATEGORIES = {
+    # JSON key -> category name used in score records, prose and reports
+    "factual_accuracy": "Factual Accuracy",
+    "relevance_directness": "Relevance & Directness",
+    "structure_clarity": "Structure & Clarity (STAR Method)",
+}
+TEXT_FIELDS = {
+    "strengths": "Strengths",
+    "areas_for_improvement": "Areas for Improvement",
+    "example_rephrasing": "Example Rephrasing",
+}
+
+EVALUATION_JSON_EXAMPLE = json.dumps({
+    "scores": {key: "<integer 0-10>" for key in SCORE_CATEGORIES},
+    **{key: "<text>" for key in TEXT_FIELDS},
+})
+
+class EvaluationSchemaError(ValueError):
+    """The model's reply was not an evaluation matching the schema."""
+
+def empty_scores():
+    return {name: None for name in SCORE_CATEGORIES.values()}
+
+def validate_evaluation(data):
+    """Checks a decoded evaluation object and returns it with scores keyed by category name."""
+    if not isinstance(data, dict):
+        raise EvaluationSchemaError("evaluation must be a JSON object")
+    raw_scores = data.get("scores")
+    if not isinstance(raw_scores, dict):
+        raise EvaluationSchemaError("'scores' must be an object")
+    scores = {}
+    for key, name in SCORE_CATEGORIES.items():
+        value = raw_scores.get(key)
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 10:
+            raise EvaluationSchemaError(f"scores.{key} must be an integer from 0 to 10")
+        scores[name] = value
+    record = {"scores": scores}
+    for key in TEXT_FIELDS:
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise EvaluationSchemaError(f"'{key}' must be a non-empty string")
+        record[key] = value.strip()
+    return record
+
+def parse_evaluation_json(text):
+    """Decodes and validates one evaluation; tolerates a ```json fence around the object."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise EvaluationSchemaError(f"reply is not valid JSON: {e}") from None
+    return validate_evaluation(data)
+
+def _render(scores, texts):
+    lines = ["**Score Breakdown**"]
+    lines += [f"- {name}: {scores[name]}/10" for name in SCORE_CATEGORIES.values() if name in scores]
+    lines.append("")
+    lines += [f"**{title}:** {texts[key]}" for key, title in TEXT_FIELDS.items() if key in texts]
+    return "\n".join(lines)
+
+def render_evaluation(record):
+    """Renders a validated evaluation as the markdown shown to candidates and in reports."""
+    return _render(record["scores"], record)
+
+_PARTIAL_SCORE = re.compile(r'"(%s)"\s*:\s*(\d{1,2})\s*[,}]' % "|".join(SCORE_CATEGORIES))
+_PARTIAL_TEXT = re.compile(r'"(%s)"\s*:\s*"((?:[^"\\]|\\.)*)' % "|".join(TEXT_FIELDS))
+
+def _decode_partial_string(raw):
+    # The reply may stop inside a \uXXXX escape; leave it out until the rest arrives
+    raw = re.sub(r"\\u[0-9a-fA-F]{0,3}$", "", raw)
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw
+
+def render_partial_evaluation(text):
+    """
+    Renders the part of a streamed JSON evaluation received so far in the layout of
+    render_evaluation: each score once its value is complete, text fields as they grow.
+    """
+    scores = {SCORE_CATEGORIES[key]: int(value) for key, value in _PARTIAL_SCORE.findall(text) if int(value) <= 10}
+    texts = {key: _decode_partial_string(value).strip() for key, value in _PARTIAL_TEXT.findall(text)}
+    return _render(scores, texts)
+
+_SCORE_LINE = re.compile(
+    r"(Factual Accuracy|Relevance & Directness|Structure & Clarity(?: \(STAR Method\))?)\W*\s*\[?(\d{1,2})\]?\s*/\s*10",
+    re.IGNORECASE)
+_CATEGORY_BY_PREFIX = {name.split(" (")[0].lower(): name for name in SCORE_CATEGORIES.values()}
+
+def parse_scores_from_evaluation(evaluation_text):
+    """
+    Extracts `Category: N/10` scores from free-form evaluation text, e.g. a streamed
+    evaluation. Categories that are missing or out of range are None, not 0.
+    """
+    scores = empty_scores()
+    for category, value in _SCORE_LINE.findall(evaluation_text or ""):
+        name = _CATEGORY_BY_PREFIX[category.split(" (")[0].lower()]
+        if scores[name] is None and int(value) <= 10:
+            scores[name] = int(value)
+    return scores
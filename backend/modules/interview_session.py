@@ -0,0 +1,189 @@
+# modules/interview_session.py
+import asyncio
+import time
+import uuid
+from modules.session_store import get_session_store
+from modules.llm_client import run_on_llm_loop
+from modules.llm_handler import evaluate_answer_scored, aevaluate_answer_scored, stream_evaluation_scored
+from modules.evaluation_schema import empty_scores
+from modules.question_prefetcher import get_prefetcher, discard_prefetcher, QuestionGenerationError  # noqa: F401  (re-exported)
+from modules.performance_summary import get_summarizer, discard_summarizer
+from modules.report_jobs import submit_report
+from modules.job_queue import get_job_queue
+from modules.metrics import stage_timer, time_stage
+
+# Interview progress lives in the session store rather than in the client or in one
+# process, so any worker can serve any turn. Only the in-flight question prefetch and
+# performance summary update are process-local, and they are rebuilt from the session
+# record when a turn lands elsewhere.
+# An answer is only saved together with the question that follows it (or the finished
+# interview), so when the next question cannot be generated the stored session is still
+# on the answered question and the turn can simply be retried.
+# The a-prefixed variants are for async servers: they await the LLM instead of blocking
+# a thread on it, and run session store and report I/O in worker threads.
+
+def _prefetcher_for(session):
+    return get_prefetcher(session["session_id"], session["interview_type"], session["doc_context"],
+                          session["asked_questions"])
+
+def _summarizer_for(session):
+    return get_summarizer(session["session_id"], session.get("performance_summary", ""), session.get("summarized_turns", 0))
+
+def load_session(session_id):
+    return get_session_store().get(session_id)
+
+def save_session(session):
+    get_session_store().put(session["session_id"], session)
+
+async def aload_session(session_id):
+    return await asyncio.to_thread(load_session, session_id)
+
+async def asave_session(session):
+    await asyncio.to_thread(save_session, session)
+
+def _new_session(interview_type, document, name, question_count):
+    return {
+        "session_id": uuid.uuid4().hex,
+        "interview_type": interview_type,
+        "doc_hash": document["hash"],
+        "doc_context": document["context"],
+        "name": name if name else "User",
+        "question_count": int(question_count),
+        "current_question_num": 1,
+        "asked_questions": [],
+        "interview_log": [],
+        "performance_summary": "",
+        "summarized_turns": 0,
+        "start_time": time.time()
+    }
+
+def _ask_first_question(session, prefetcher, question):
+    session["current_question_text"] = question
+    session["asked_questions"].append(question)
+    if session["question_count"] > 1:
+        # Question 2 is generated while the candidate answers question 1
+        prefetcher.prefetch()
+
+def start_session(interview_type, document, name, question_count):
+    """Creates a session for a processed document and generates its first question."""
+    session = _new_session(interview_type, document, name, question_count)
+    prefetcher = _prefetcher_for(session)
+    with stage_timer("question", session["session_id"], 0):
+        question = prefetcher.next_question()
+    _ask_first_question(session, prefetcher, question)
+    save_session(session)
+    return session
+
+async def astart_session(interview_type, document, name, question_count):
+    session = _new_session(interview_type, document, name, question_count)
+    prefetcher = _prefetcher_for(session)
+    with stage_timer("question", session["session_id"], 0):
+        question = await prefetcher.anext_question()
+    _ask_first_question(session, prefetcher, question)
+    await asave_session(session)
+    return session
+
+def _log_answer(session, answer, evaluation, scores):
+    session["interview_log"].append({
+        "question": session["current_question_text"],
+        "answer": answer,
+        "evaluation": evaluation,
+        "scores": scores
+    })
+    summary, summarized_turns = _summarizer_for(session).snapshot()
+    if summarized_turns >= session.get("summarized_turns", 0):
+        session["performance_summary"], session["summarized_turns"] = summary, summarized_turns
+
+def record_answer(session, answer):
+    """
+    Evaluates the answer to the current question and adds it, with its typed scores, to
+    the interview log. Returns the evaluation text. The session is saved by the
+    advance_to_next_question or finish_session call that follows.
+    """
+    with stage_timer("evaluation", session["session_id"], session["current_question_num"]):
+        result = evaluate_answer_scored(session["current_question_text"], answer)
+    _log_answer(session, answer, result["evaluation"], result["scores"])
+    return result["evaluation"]
+
+async def arecord_answer(session, answer):
+    with stage_timer("evaluation", session["session_id"], session["current_question_num"]):
+        result = await run_on_llm_loop(aevaluate_answer_scored(session["current_question_text"], answer))
+    _log_answer(session, answer, result["evaluation"], result["scores"])
+    return result["evaluation"]
+
+def stream_record_answer(session, answer):
+    """
+    Like record_answer, but yields the evaluation text generated so far as it streams in.
+    The answer is only logged once the evaluation is complete.
+    """
+    result = {"evaluation": "", "scores": None}
+    partials = time_stage("evaluation", stream_evaluation_scored(session["current_question_text"], answer),
+                          session["session_id"], session["current_question_num"])
+    try:
+        for result in partials:
+            yield result["evaluation"]
+    except Exception as e:
+        result = {"evaluation": f"An error occurred during evaluation: {e}", "scores": None}
+        yield result["evaluation"]
+    _log_answer(session, answer, result["evaluation"], result["scores"] or empty_scores())
+
+def is_finished(session):
+    return session["current_question_num"] >= session["question_count"]
+
+def _ask_next_question(session, prefetcher, question):
+    session["current_question_num"] += 1
+    session["current_question_text"] = question
+    session["asked_questions"].append(question)
+    if not is_finished(session):
+        prefetcher.prefetch()
+    # Off the critical path: the summary catches up while the candidate answers the next question
+    _summarizer_for(session).update(session["interview_log"])
+
+def advance_to_next_question(session):
+    """
+    Moves on to the next question and saves the session with the answer just recorded.
+    Raises QuestionGenerationError, without saving, when the question cannot be generated.
+    """
+    prefetcher = _prefetcher_for(session)
+    # Waiting for the next question is part of the turn that answered the current one
+    with stage_timer("question", session["session_id"], session["current_question_num"]):
+        question = prefetcher.next_question()
+    _ask_next_question(session, prefetcher, question)
+    save_session(session)
+    return question
+
+async def aadvance_to_next_question(session):
+    prefetcher = _prefetcher_for(session)
+    with stage_timer("question", session["session_id"], session["current_question_num"]):
+        question = await prefetcher.anext_question()
+    _ask_next_question(session, prefetcher, question)
+    await asave_session(session)
+    return question
+
+def finish_session(session):
+    """Starts building the report for a completed interview and returns its job ID."""
+    discard_prefetcher(session["session_id"])
+    discard_summarizer(session["session_id"])
+    session["report_job_id"] = submit_report({
+        "name": session.get("name", "N/A"),
+        "type": session.get("interview_type", "N/A"),
+        "duration": (time.time() - session.get("start_time", time.time())) / 60,
+        "q_and_a": session.get("interview_log", []),
+        "performance_summary": session.get("performance_summary", ""),
+        "summarized_turns": session.get("summarized_turns", 0)
+    }, owner=session["session_id"])
+    save_session(session)
+    return session["report_job_id"]
+
+async def afinish_session(session):
+    return await asyncio.to_thread(finish_session, session)
+
+def end_session(session_id):
+    """Drops the session; its CPU jobs that have not started yet (e.g. a queued report) are cancelled."""
+    discard_prefetcher(session_id)
+    discard_summarizer(session_id)
+    get_job_queue().cancel_owner(session_id)
+    get_session_store().delete(session_id)
+
+async def aend_session(session_id):
+    await asyncio.to_thread(end_session, session_id)
@@ -0,0 +1,191 @@
+# modules/job_queue.py
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+import collections
+import multiprocessing
+import functools
+import threading
+import time
+import config
+from modules.metrics import get_metrics_registry
+
+LANES = ("interactive", "background")   # dispatched in this order
+
+def _timed_call(fn, args):
+    """Runs in a worker process: returns fn's result and how long it took."""
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+class _Job:
+    __slots__ = ("fn", "args", "lane", "owner", "kind", "future", "submitted")
+
+    def __init__(self, fn, args, lane, owner, kind):
+        self.fn, self.args, self.lane, self.owner, self.kind = fn, args, lane, owner, kind
+        self.future = concurrent.futures.Future()
+        self.submitted = time.perf_counter()
+
+class JobQueue:
+    """
+    Runs CPU-heavy functions (Whisper, PDF parsing, chart rendering, PDF builds) in a
+    shared pool of worker processes, so they spread across cores instead of contending
+    for the web process's GIL. Jobs wait in priority lanes and are only handed to the pool
+    when a worker is free, so an interactive job never queues behind more than the jobs
+    already running; background jobs may hold at most `background_workers` workers, which
+    leaves at least one worker to interactive jobs unless the queue has only one.
+    Jobs still waiting can be cancelled per owner, e.g. when a session is abandoned.
+    Functions and arguments must be picklable; functions must be defined at module level.
+    `name` labels the queue's metrics when a process runs more than one queue.
+    """
+
+    def __init__(self, workers=config.JOB_WORKERS, background_workers=config.JOB_BACKGROUND_WORKERS, name="cpu"):
+        self.name = name
+        self.workers = workers
+        self.background_workers = max(1, min(background_workers, workers - 1))
+        self._pending = {lane: collections.deque() for lane in LANES}
+        self._running = collections.Counter()  # lane -> jobs handed to the pool
+        self._cancelled = 0
+        self._lock = threading.RLock()  # a pool future may complete, and call back, while we dispatch
+        self._pool = None
+
+    def _get_pool(self):
+        # Callers hold self._lock
+        if self._pool is None:
+            # spawn, not fork: the servers are multi-threaded and forking them can deadlock
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                                mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def submit(self, fn, *args, lane="interactive", owner=None, kind=None):
+        """Queues fn(*args) to run in a worker process and returns a concurrent.futures.Future."""
+        if lane not in self._pending:
+            raise ValueError(f"Unknown job lane: {lane}")
+        job = _Job(fn, args, lane, owner, kind or fn.__name__)
+        with self._lock:
+            self._pending[lane].append(job)
+            self._dispatch()
+        return job.future
+
+    def _has_free_worker(self, lane):
+        if sum(self._running.values()) >= self.workers:
+            return False
+        return lane != "background" or self._running["background"] < self.background_workers
+
+    def _dispatch(self):
+        # Callers hold self._lock
+        for lane in LANES:
+            pending = self._pending[lane]
+            while pending and self._has_free_worker(lane):
+                job = pending.popleft()
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                self._running[lane] += 1
+                get_metrics_registry().observe("job_wait_seconds", time.perf_counter() - job.submitted,
+                                               "Time CPU jobs waited for a worker process", queue=self.name, lane=lane)
+                try:
+                    pool_future = self._get_pool().submit(_timed_call, job.fn, job.args)
+                except Exception as e:
+                    self._running[lane] -= 1
+                    job.future.set_exception(e)
+                    continue
+                pool_future.add_done_callback(functools.partial(self._finished, job))
+
+    def _finished(self, job, pool_future):
+        try:
+            result, seconds = pool_future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died (e.g. out of memory); the next job starts a fresh pool
+                with self._lock:
+                    self._pool = None
+            job.future.set_exception(e)
+        else:
+            get_metrics_registry().observe("job_run_seconds", seconds, "Time CPU jobs ran in a worker process",
+                                           queue=self.name, kind=job.kind)
+            job.future.set_result(result)
+        finally:
+            with self._lock:
+                self._running[job.lane] -= 1
+                self._dispatch()
+
+    def cancel_owner(self, owner):
+        """Cancels the owner's jobs that have not started. Returns how many were cancelled."""
+        cancelled = 0
+        with self._lock:
+            for lane, pending in self._pending.items():
+                kept = collections.deque()
+                for job in pending:
+                    if job.owner == owner and job.future.cancel():
+                        cancelled += 1
+                    else:
+                        kept.append(job)
+                self._pending[lane] = kept
+            self._cancelled += cancelled
+        return cancelled
+
+    def depth(self):
+        with self._lock:
+            return {lane: len(pending) for lane, pending in self._pending.items()}
+
+    def warm_up(self):
+        """Starts every worker process ahead of the first job."""
+        with self._lock:
+            pool = self._get_pool()
+        list(pool.map(abs, range(self.workers)))
+
+    def shutdown(self):
+        with self._lock:
+            for pending in self._pending.values():
+                for job in pending:
+                    job.future.cancel()
+                pending.clear()
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def metrics_lines(self):
+        """Queue depth, running jobs and cancellations as Prometheus samples, see job_queue_metrics_lines."""
+        with self._lock:
+            depth = [f'job_queue_depth{{queue="{self.name}",lane="{lane}"}} {len(self._pending[lane])}' for lane in LANES]
+            running = [f'job_queue_running{{queue="{self.name}",lane="{lane}"}} {self._running[lane]}' for lane in LANES]
+            cancelled = [f'job_queue_cancelled_total{{queue="{self.name}"}} {self._cancelled}']
+        return depth + running + cancelled
+
+def job_queue_metrics_lines():
+    """Metrics of the shared queue and, once speech has been transcribed, of the STT queue."""
+    queues = [get_job_queue()] + ([_stt_queue] if _stt_queue is not None else [])
+    lines = []
+    for help_text, metric, kind in (("CPU jobs waiting for a worker process", "job_queue_depth", "gauge"),
+                                    ("CPU jobs running in worker processes", "job_queue_running", "gauge"),
+                                    ("CPU jobs cancelled before they started", "job_queue_cancelled_total", "counter")):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [line for job_queue in queues for line in job_queue.metrics_lines() if line.startswith(metric + "{")]
+    return lines
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+def set_job_queue(job_queue):
+    """Replaces the shared queue, e.g. with a smaller one in benchmarks."""
+    global _queue
+    with _queue_lock:
+        _queue = job_queue
+
+_stt_queue = None
+
+def get_stt_job_queue():
+    """
+    The queue Whisper transcriptions run in. Each of its workers keeps a warm model, so
+    it is kept apart from the shared queue to bound how many copies are loaded.
+    """
+    global _stt_queue
+    with _queue_lock:
+        if _stt_queue is None:
+            _stt_queue = JobQueue(workers=config.STT_PROCESS_WORKERS, background_workers=1, name="stt")
+        return _stt_queue
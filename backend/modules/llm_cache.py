@@ -0,0 +1,148 @@
+# modules/llm_cache.py
+import collections
+import threading
+import hashlib
+import sqlite3
+import queue
+import time
+import os
+import numpy as np
+import config
+
+class LLMResponseCache:
+    """
+    Cache of LLM replies with two tiers: an exact tier keyed by a hash of (call type,
+    JSON mode, prompt), and an optional similarity tier that reuses the reply to an
+    earlier prompt whose embedding is within `similarity_threshold` cosine similarity.
+    Entries expire after `ttl` seconds and the least recently used are evicted beyond
+    `max_entries`. With a `path`, entries are also kept in a SQLite file so they survive
+    restarts (LRU order is rebuilt from insertion time). Lookups and updates only touch
+    memory; a write-behind thread applies changes to the file, so callers on the LLM event
+    loop never wait on SQLite.
+    """
+
+    def __init__(self, path=config.LLM_CACHE_PATH, ttl=config.LLM_CACHE_TTL_SECONDS,
+                 max_entries=config.LLM_CACHE_MAX_ENTRIES, call_types=config.LLM_CACHE_CALL_TYPES,
+                 similarity_threshold=config.LLM_CACHE_SIMILARITY_THRESHOLD,
+                 semantic_call_types=config.LLM_CACHE_SEMANTIC_CALL_TYPES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.call_types = set(call_types)
+        self.similarity_threshold = similarity_threshold
+        self.semantic_call_types = set(semantic_call_types) if similarity_threshold else set()
+        self._entries = collections.OrderedDict()  # key -> (call_type, text, expires_at, unit embedding or None)
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = queue.Queue()  # (statement, parameters), applied in order by the writer thread
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, call_type TEXT NOT NULL, "
+                             "text TEXT NOT NULL, embedding BLOB, expires_at REAL NOT NULL)")
+            self._load()
+            threading.Thread(target=self._write_behind, name="llm-cache-writer", daemon=True).start()
+
+    def _write_behind(self):
+        while True:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._db:
+                    for statement, parameters in batch:
+                        self._db.execute(statement, parameters)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not write {len(batch)} change(s) to the LLM response cache: {e}")
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    def flush(self):
+        """Waits until every change so far has been written to the SQLite file."""
+        self._writes.join()
+
+    def _load(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            rows = self._db.execute("SELECT key, call_type, text, embedding, expires_at FROM llm_cache ORDER BY rowid").fetchall()
+        for key, call_type, text, embedding, expires_at in rows[-self.max_entries:]:
+            vector = np.frombuffer(embedding, dtype=np.float32) if embedding else None
+            self._entries[key] = (call_type, text, expires_at, vector)
+
+    def caches(self, call_type):
+        return call_type in self.call_types
+
+    def matches_similar(self, call_type):
+        return call_type in self.semantic_call_types
+
+    @staticmethod
+    def key_for(prompt, call_type, json_mode=False):
+        return hashlib.sha256(f"{call_type}\0{int(json_mode)}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_similar(self, call_type, embedding):
+        """
+        Returns (key, reply) for the cached reply whose prompt embedding is most similar, or
+        None if none is above the threshold.
+        """
+        query = _unit(embedding)
+        now = time.time()
+        with self._lock:
+            candidates = [(key, entry[3]) for key, entry in self._entries.items()
+                          if entry[0] == call_type and entry[3] is not None and entry[2] >= now
+                          and entry[3].shape == query.shape]
+            if not candidates:
+                return None
+            similarities = np.stack([vector for _, vector in candidates]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                return None
+            key = candidates[best][0]
+            self._entries.move_to_end(key)
+            return key, self._entries[key][1]
+
+    def put(self, key, call_type, text, embedding=None):
+        vector = _unit(embedding) if embedding is not None else None
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (call_type, text, expires_at, vector)
+            self._entries.move_to_end(key)
+            if self._db is not None:
+                self._writes.put(("INSERT OR REPLACE INTO llm_cache (key, call_type, text, embedding, expires_at) "
+                                  "VALUES (?, ?, ?, ?, ?)",
+                                  (key, call_type, text, vector.tobytes() if vector is not None else None, expires_at)))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        # Callers hold self._lock
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._writes.put(("DELETE FROM llm_cache WHERE key = ?", (key,)))
+
+    def __len__(self):
+        return len(self._entries)
+
+def _unit(embedding):
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,528 @@
+# modules/llm_client.py
+import asyncio
+import collections
+import contextlib
+import threading
+import queue
+import random
+import time
+import zlib
+import config
+from modules.metrics import get_metrics_registry
+
+# --- Backends ---
+# Each backend exposes `async generate(prompt, json_mode=False)` returning a dict with the
+# response text and the prompt/completion token counts reported by the provider (0 when
+# unknown); json_mode asks the provider to constrain the reply to a JSON object. Backends
+# also expose `stream(prompt, usage, json_mode=False)`, an async generator of text chunks that fills in `usage`,
+# and `async embed(text)`, which returns an embedding vector for the response cache.
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model_name=config.GEMINI_MODEL, api_key=config.GEMINI_API_KEY,
+                 embedding_model=config.GEMINI_EMBEDDING_MODEL):
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY is not set: export it, or choose another LLM_BACKEND")
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model = genai.GenerativeModel(model_name)
+        self.embedding_model = embedding_model
+
+    async def generate(self, prompt, json_mode=False):
+        generation_config = {"response_mime_type": "application/json"} if json_mode else None
+        response = await self.model.generate_content_async(prompt, generation_config=generation_config)
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "text": response.text,
+            "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "completion_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        }
+
+    async def stream(self, prompt, usage, json_mode=False):
+        generation_config = {"response_mime_type": "application/json"} if json_mode else None
+        response = await self.model.generate_content_async(prompt, stream=True, generation_config=generation_config)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        metadata = getattr(response, "usage_metadata", None)
+        usage["prompt_tokens"] = getattr(metadata, "prompt_token_count", 0) or 0
+        usage["completion_tokens"] = getattr(metadata, "candidates_token_count", 0) or 0
+
+    async def embed(self, text):
+        result = await self.genai.embed_content_async(model=self.embedding_model, content=text)
+        return result["embedding"]
+
+class OllamaBackend:
+    name = "ollama"
+
+    def __init__(self, model_name=config.OLLAMA_MODEL, host=config.OLLAMA_HOST, embedding_model=config.OLLAMA_EMBEDDING_MODEL):
+        import ollama
+        self.model_name = model_name
+        self.embedding_model = embedding_model
+        self.client = ollama.AsyncClient(host=host)
+
+    async def generate(self, prompt, json_mode=False):
+        response = await self.client.generate(model=self.model_name, prompt=prompt, format="json" if json_mode else "")
+        return {
+            "text": response["response"],
+            "prompt_tokens": response.get("prompt_eval_count", 0) or 0,
+            "completion_tokens": response.get("eval_count", 0) or 0,
+        }
+
+    async def stream(self, prompt, usage, json_mode=False):
+        async for part in await self.client.generate(model=self.model_name, prompt=prompt, stream=True,
+                                                     format="json" if json_mode else ""):
+            if part.get("response"):
+                yield part["response"]
+            if part.get("done"):
+                usage["prompt_tokens"] = part.get("prompt_eval_count", 0) or 0
+                usage["completion_tokens"] = part.get("eval_count", 0) or 0
+
+    async def embed(self, text):
+        response = await self.client.embeddings(model=self.embedding_model, prompt=text)
+        return response["embedding"]
+
+class FakeBackend:
+    """Local stand-in for tests and benchmarks. `responder(prompt)` builds the reply text."""
+    name = "fake"
+
+    def __init__(self, latency=0.0, responder=None, failure_rate=0.0, token_delay=0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.responder = responder or (lambda prompt: f"Fake response to: {prompt.strip()[:80]}")
+        self.failure_rate = failure_rate
+
+    async def generate(self, prompt, json_mode=False):
+        delay = self.latency() if callable(self.latency) else self.latency
+        await asyncio.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Fake backend failure")
+        text = self.responder(prompt)
+        return {"text": text, "prompt_tokens": len(prompt.split()), "completion_tokens": len(text.split())}
+
+    async def stream(self, prompt, usage, json_mode=False):
+        result = await self.generate(prompt, json_mode)
+        for word in result["text"].split(" "):
+            await asyncio.sleep(self.token_delay)
+            yield word + " "
+        usage["prompt_tokens"] = result["prompt_tokens"]
+        usage["completion_tokens"] = result["completion_tokens"]
+
+    async def embed(self, text, dimensions=256):
+        # Hashed bag of words: texts sharing most of their words get similar vectors
+        vector = [0.0] * dimensions
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode("utf-8")) % dimensions] += 1.0
+        return vector
+
+BACKENDS = {"gemini": GeminiBackend, "ollama": OllamaBackend, "fake": FakeBackend}
+
+def _passes(validate, text):
+    if validate is None:
+        return True
+    try:
+        validate(text)
+        return True
+    except Exception:
+        return False
+
+def _is_retryable(error):
+    """
+    Timeouts, dropped connections, rate limits (429) and server errors (5xx) are worth
+    another attempt; auth and invalid-request errors would only fail the same way again.
+    """
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ == "TransportError" for cls in type(error).__mro__):
+        return True  # httpx (used by the ollama client): connect/read failures
+    # google.api_core errors carry the HTTP status as `code`, ollama's ResponseError as `status_code`
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+# --- Metrics ---
+
+class LLMMetrics:
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self.calls = collections.Counter()
+        self.failures = collections.Counter()
+        self.retries = collections.Counter()
+        self.cache_lookups = collections.Counter()
+        self.cache_hits = collections.Counter()
+        self.cache_similar_hits = collections.Counter()
+        self.timeouts = collections.Counter()
+        self.schema_failures = collections.Counter()
+        self.prompt_tokens = collections.Counter()
+        self.completion_tokens = collections.Counter()
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self.first_token_latencies = collections.defaultdict(lambda: collections.deque(maxlen=window))
+
+    def record_success(self, call_type, latency, prompt_tokens, completion_tokens):
+        get_metrics_registry().observe("llm_call_seconds", latency, "Latency of successful LLM calls", call_type=call_type)
+        with self._lock:
+            self.calls[call_type] += 1
+            self.latencies[call_type].append(latency)
+            self.prompt_tokens[call_type] += prompt_tokens
+            self.completion_tokens[call_type] += completion_tokens
+
+    def record_first_token(self, call_type, latency):
+        with self._lock:
+            self.first_token_latencies[call_type].append(latency)
+
+    def record_retry(self, call_type, timed_out):
+        with self._lock:
+            self.retries[call_type] += 1
+            if timed_out:
+                self.timeouts[call_type] += 1
+
+    def record_cache_lookup(self, call_type, outcome):
+        """`outcome` is "exact", "similar" or None for a miss."""
+        with self._lock:
+            self.cache_lookups[call_type] += 1
+            if outcome == "exact":
+                self.cache_hits[call_type] += 1
+            elif outcome == "similar":
+                self.cache_similar_hits[call_type] += 1
+
+    def record_schema_failure(self, call_type):
+        with self._lock:
+            self.schema_failures[call_type] += 1
+
+    def record_failure(self, call_type):
+        with self._lock:
+            self.failures[call_type] += 1
+
+    def snapshot(self):
+        with self._lock:
+            summary = {}
+            for call_type in set(self.calls) | set(self.failures) | set(self.cache_lookups):
+                latencies = sorted(self.latencies[call_type])
+                first_token = sorted(self.first_token_latencies[call_type])
+                summary[call_type] = {
+                    "calls": self.calls[call_type],
+                    "failures": self.failures[call_type],
+                    "retries": self.retries[call_type],
+                    "timeouts": self.timeouts[call_type],
+                    "schema_failures": self.schema_failures[call_type],
+                    "prompt_tokens": self.prompt_tokens[call_type],
+                    "completion_tokens": self.completion_tokens[call_type],
+                    "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+                    "latency_max": latencies[-1] if latencies else None,
+                    "first_token_p50": first_token[len(first_token) // 2] if first_token else None,
+                    "cache_lookups": self.cache_lookups[call_type],
+                    "cache_hits": self.cache_hits[call_type],
+                    "cache_similar_hits": self.cache_similar_hits[call_type],
+                    "cache_hit_rate": ((self.cache_hits[call_type] + self.cache_similar_hits[call_type])
+                                       / self.cache_lookups[call_type]) if self.cache_lookups[call_type] else None,
+                }
+            return summary
+
+# --- Client ---
+
+LANES = ("interactive", "background")   # served in this order
+
+class _CallSlots:
+    """
+    Bounds the LLM calls in flight per lane. Interactive calls hold up to `interactive`
+    slots; background calls (e.g. running summaries) have `background` slots of their own
+    on top, so they never hold one a live turn could use, and they only start while no
+    interactive call is waiting, so they add no load to a saturated backend. Calls in a
+    lane start in arrival order. Used from the LLM loop only.
+    """
+
+    def __init__(self, interactive, background):
+        self.limits = {"interactive": interactive, "background": background}
+        self._in_use = collections.Counter()  # lane -> calls running
+        self._waiters = {lane: collections.deque() for lane in LANES}
+
+    def _can_start(self, lane):
+        if self._in_use[lane] >= self.limits[lane]:
+            return False
+        return lane != "background" or not self._waiters["interactive"]
+
+    def _wake(self):
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and self._can_start(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._in_use[lane] += 1
+                    waiter.set_result(None)
+
+    async def acquire(self, lane):
+        if lane not in self._waiters:
+            raise ValueError(f"Unknown LLM lane: {lane}")
+        if not self._waiters[lane] and self._can_start(lane):
+            self._in_use[lane] += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(lane)  # the slot was handed over just as the call was cancelled
+            elif waiter in self._waiters[lane]:
+                self._waiters[lane].remove(waiter)
+                self._wake()  # a background call may have been held back by this one
+            raise
+
+    def release(self, lane):
+        self._in_use[lane] -= 1
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def hold(self, lane):
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+class LLMClient:
+    """
+    Async front door to an LLM backend: serves repeated prompts from an optional response
+    cache, bounds concurrent calls (with a separate, lower-priority lane for background
+    calls), applies a per-attempt timeout, retries transient failures with jittered exponential
+    backoff and records metrics.
+    """
+
+    def __init__(self, backend, max_concurrency=config.LLM_MAX_CONCURRENCY, timeout=config.LLM_TIMEOUT_SECONDS,
+                 max_retries=config.LLM_MAX_RETRIES, backoff_base=config.LLM_BACKOFF_BASE_SECONDS, cache=None,
+                 background_concurrency=config.LLM_BACKGROUND_MAX_CONCURRENCY):
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.metrics = LLMMetrics()
+        self._slots = _CallSlots(max_concurrency, background_concurrency)
+
+    async def _embed(self, text):
+        try:
+            return await asyncio.wait_for(self.backend.embed(text), self.timeout)
+        except Exception as e:
+            print(f"⚠️ Could not embed prompt for the response cache: {e}")
+            return None
+
+    async def _cached(self, key, call_type, similarity_key):
+        """
+        Looks a prompt up in the cache. Returns (reply or None, key of the entry it came
+        from, embedding computed for the prompt).
+        """
+        text, outcome, embedding = self.cache.get(key), "exact", None
+        if text is None and similarity_key and self.cache.matches_similar(call_type):
+            embedding = await self._embed(similarity_key)
+            match = self.cache.get_similar(call_type, embedding) if embedding is not None else None
+            if match is not None:
+                (key, text), outcome = match, "similar"
+        self.metrics.record_cache_lookup(call_type, outcome if text is not None else None)
+        return text, key, embedding
+
+    def _uses_cache(self, call_type, cache):
+        return cache and self.cache is not None and self.cache.caches(call_type)
+
+    def invalidate(self, prompt, call_type="generic", json_mode=False):
+        """Drops a cached reply, e.g. one that turned out not to match the expected schema."""
+        if self.cache is not None:
+            self.cache.delete(self.cache.key_for(prompt, call_type, json_mode))
+
+    async def generate(self, prompt, call_type="generic", json_mode=False, cache=True, similarity_key=None, validate=None,
+                       lane="interactive"):
+        """
+        Returns the reply text. Call types listed in LLM_CACHE_CALL_TYPES are served from
+        the cache unless `cache` is False; `similarity_key`, the part of the prompt that
+        varies between calls, lets the cache match near-duplicate prompts. With `validate`
+        (a callable raising on a bad reply), cached replies that fail it are deleted
+        instead of served, and new replies that fail it are returned but not cached.
+        `lane="background"` is for calls no one is waiting on, see _CallSlots.
+        """
+        if not self._uses_cache(call_type, cache):
+            return await self._generate(prompt, call_type, json_mode, lane)
+        key = self.cache.key_for(prompt, call_type, json_mode)
+        text, cached_key, embedding = await self._cached(key, call_type, similarity_key)
+        if text is not None and not _passes(validate, text):
+            self.cache.delete(cached_key)
+            text = None
+        if text is None:
+            text = await self._generate(prompt, call_type, json_mode, lane)
+            if embedding is None and similarity_key and self.cache.matches_similar(call_type):
+                embedding = await self._embed(similarity_key)
+            if _passes(validate, text):
+                self.cache.put(key, call_type, text, embedding)
+        return text
+
+    async def _generate(self, prompt, call_type, json_mode, lane):
+        for attempt in range(self.max_retries + 1):
+            timed_out = False
+            async with self._slots.hold(lane):
+                started = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(self.backend.generate(prompt, json_mode=json_mode), self.timeout)
+                    self.metrics.record_success(call_type, time.perf_counter() - started,
+                                                result["prompt_tokens"], result["completion_tokens"])
+                    return result["text"]
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    error = TimeoutError(f"LLM call timed out after {self.timeout}s")
+                except Exception as e:
+                    error = e
+            if attempt == self.max_retries or not _is_retryable(error):
+                self.metrics.record_failure(call_type)
+                raise error
+            self.metrics.record_retry(call_type, timed_out)
+            # Full jitter: sleep a random amount up to the exponential backoff ceiling
+            await asyncio.sleep(random.uniform(0, self.backoff_base * 2 ** attempt))
+
+    async def stream(self, prompt, call_type="generic", cache=True, json_mode=False):
+        """
+        Yields response text chunks as the backend produces them. The timeout applies to
+        the wait for each chunk, and a call is only retried if it failed before its first
+        chunk, so the caller never sees repeated text. A cached reply is yielded whole.
+        """
+        key = self.cache.key_for(prompt, call_type, json_mode) if self._uses_cache(call_type, cache) else None
+        if key:
+            text, _, _ = await self._cached(key, call_type, None)
+            if text is not None:
+                yield text
+                return
+        chunks = []
+        async for chunk in self._stream(prompt, call_type, json_mode):
+            chunks.append(chunk)
+            yield chunk
+        if key:
+            self.cache.put(key, call_type, "".join(chunks))
+
+    async def _stream(self, prompt, call_type, json_mode):
+        for attempt in range(self.max_retries + 1):
+            timed_out, received_any = False, False
+            async with self._slots.hold("interactive"):
+                started = time.perf_counter()
+                usage = {"prompt_tokens": 0, "completion_tokens": 0}
+                chunks = self.backend.stream(prompt, usage, json_mode)
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                        except StopAsyncIteration:
+                            break
+                        if not received_any:
+                            received_any = True
+                            self.metrics.record_first_token(call_type, time.perf_counter() - started)
+                        yield chunk
+                    self.metrics.record_success(call_type, time.perf_counter() - started,
+                                                usage["prompt_tokens"], usage["completion_tokens"])
+                    return
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    error = TimeoutError(f"LLM stream stalled for more than {self.timeout}s")
+                except Exception as e:
+                    error = e
+                finally:
+                    await chunks.aclose()
+            if received_any or attempt == self.max_retries or not _is_retryable(error):
+                self.metrics.record_failure(call_type)
+                raise error
+            self.metrics.record_retry(call_type, timed_out)
+            await asyncio.sleep(random.uniform(0, self.backoff_base * 2 ** attempt))
+
+# --- Shared client and event loop ---
+# Flask and Gradio handlers are synchronous, so the shared client lives on one background
+# event loop; sync callers block on run_sync while async servers await run_on_llm_loop.
+
+_loop = None
+_client = None
+_init_lock = threading.Lock()
+
+def _get_loop():
+    global _loop
+    with _init_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-loop", daemon=True).start()
+        return _loop
+
+def get_llm_client():
+    global _client
+    with _init_lock:
+        if _client is None:
+            cache = None
+            if config.LLM_CACHE_ENABLED:
+                from modules.llm_cache import LLMResponseCache
+                cache = LLMResponseCache()
+            _client = LLMClient(BACKENDS[config.LLM_BACKEND](), cache=cache)
+        return _client
+
+def set_llm_client(client):
+    """Replaces the shared client, e.g. with one wrapping FakeBackend in tests."""
+    global _client
+    with _init_lock:
+        _client = client
+
+def submit(coro):
+    """Schedules a coroutine on the shared LLM loop and returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+def run_sync(coro):
+    return submit(coro).result()
+
+def iterate_sync(async_iterable):
+    """Consumes an async iterator on the shared LLM loop and yields its items to a sync caller."""
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put(item)
+        except Exception as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    future = submit(pump())
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stops the upstream call if the sync consumer goes away early
+        future.cancel()
+
+async def run_on_llm_loop(coro):
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _get_loop()))
+
+async def aiterate_on_llm_loop(async_iterable):
+    """Consumes an async iterator on the shared LLM loop and yields its items on the caller's loop."""
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                loop.call_soon_threadsafe(items.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(items.put_nowait, done)
+
+    future = submit(pump())
+    try:
+        while True:
+            item = await items.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Stops the upstream call if the consumer goes away early, e.g. the client disconnected
+        future.cancel()
@@ -0,0 +1,269 @@
+# modules/metrics.py
+import collections
+import contextlib
+import threading
+import bisect
+import time
+import sys
+import os
+import config
+
+# Per-stage timers for the interview pipeline. Every timed stage feeds a Prometheus
+# histogram (labelled by stage only, to keep cardinality bounded) and, when it is given
+# a session and turn, that session's trace.
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    def __init__(self, buckets=config.METRICS_BUCKETS, max_traced_sessions=config.METRICS_MAX_TRACED_SESSIONS):
+        self.buckets = buckets
+        self.max_traced_sessions = max_traced_sessions
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._help = {}
+        self._traces = collections.OrderedDict()  # session_id -> {turn: {stage: seconds}}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, help_text="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self.buckets)
+                self._help.setdefault(name, help_text)
+            self._histograms[key].observe(value)
+
+    def record_stage(self, stage, seconds, session_id=None, turn=None):
+        self.observe("interview_stage_seconds", seconds, "Time spent in each interview pipeline stage", stage=stage)
+        if session_id is None:
+            return
+        with self._lock:
+            turns = self._traces.setdefault(session_id, {})
+            self._traces.move_to_end(session_id)
+            stages = turns.setdefault(turn, {})
+            stages[stage] = stages.get(stage, 0.0) + seconds
+            while len(self._traces) > self.max_traced_sessions:
+                self._traces.popitem(last=False)
+
+    def session_trace(self, session_id):
+        """Returns {turn: {stage: seconds}} for a recent session, or None."""
+        with self._lock:
+            turns = self._traces.get(session_id)
+            return {turn: dict(stages) for turn, stages in turns.items()} if turns is not None else None
+
+    def render_prometheus(self, extra_lines=()):
+        lines = []
+        with self._lock:
+            by_name = collections.defaultdict(list)
+            for (name, labels), histogram in self._histograms.items():
+                by_name[name].append((labels, histogram))
+            for name, series in sorted(by_name.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series, key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.total}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        lines.extend(extra_lines)
+        return "\n".join(lines) + "\n"
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+_registry = MetricsRegistry()
+
+def get_metrics_registry():
+    return _registry
+
+@contextlib.contextmanager
+def stage_timer(stage, session_id=None, turn=None):
+    """Times a pipeline stage, e.g. `with stage_timer("evaluation", session_id, turn): ...`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.record_stage(stage, time.perf_counter() - started, session_id, turn)
+
+def time_stage(stage, iterator, session_id=None, turn=None):
+    """
+    Wraps a generator so the time spent producing its items is recorded as one stage.
+    Time the consumer spends between items is not counted.
+    """
+    elapsed = 0.0
+    started = time.perf_counter()
+    try:
+        for item in iterator:
+            elapsed += time.perf_counter() - started
+            yield item
+            started = time.perf_counter()
+        elapsed += time.perf_counter() - started
+    finally:
+        _registry.record_stage(stage, elapsed, session_id, turn)
+
+def llm_metrics_lines(snapshot):
+    """Renders an LLMMetrics snapshot as Prometheus counters."""
+    counters = {
+        "calls": "LLM calls that succeeded", "failures": "LLM calls that failed after retries",
+        "retries": "LLM call attempts that were retried", "timeouts": "LLM call attempts that timed out",
+        "schema_failures": "LLM replies that did not match the expected schema",
+        "prompt_tokens": "Prompt tokens reported by the provider", "completion_tokens": "Completion tokens reported by the provider",
+        "cache_lookups": "LLM response cache lookups", "cache_hits": "Exact LLM response cache hits",
+        "cache_similar_hits": "Similarity-tier LLM response cache hits",
+    }
+    lines = []
+    for field, help_text in counters.items():
+        lines.append(f"# HELP llm_{field}_total {help_text}")
+        lines.append(f"# TYPE llm_{field}_total counter")
+        for call_type, values in sorted(snapshot.items()):
+            lines.append(f'llm_{field}_total{{call_type="{call_type}"}} {values[field]}')
+    return lines
+
+# --- Slow-turn profiling ---
+
+class _StackSampler:
+    """Samples every thread's stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._active = threading.Event()  # cleared while paused
+        self._active.set()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        names = {}
+        while not self._stop.wait(self.interval):
+            if not self._active.is_set():
+                continue
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == self._thread.ident:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(ident, str(ident))] + frames[::-1])] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def pause(self):
+        self._active.clear()
+
+    def resume(self):
+        self._active.set()
+
+    def dump(self, path):
+        # One "frame;frame;frame count" line per stack, as read by flamegraph.pl and speedscope
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class _TurnProfiler:
+    """A cProfile profiler (of the thread that resumes it) or a stack sampler (every thread)."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        if mode == "cprofile":
+            import cProfile
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = _StackSampler(config.PROFILE_SAMPLE_INTERVAL_SECONDS).__enter__()
+            self._profiler.pause()
+
+    def resume(self):
+        if self.mode == "cprofile":
+            self._profiler.enable()
+        else:
+            self._profiler.resume()
+
+    def pause(self):
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.pause()
+
+    def close(self, label, elapsed, threshold):
+        """Stops profiling and writes the profile to PROFILE_FOLDER if `elapsed` reached `threshold`."""
+        if self.mode != "cprofile":
+            self._profiler.__exit__(None, None, None)
+        if elapsed < threshold:
+            return
+        os.makedirs(config.PROFILE_FOLDER, exist_ok=True)
+        extension = "prof" if self.mode == "cprofile" else "collapsed.txt"
+        path = os.path.join(config.PROFILE_FOLDER, f"{label}_{int(time.time())}.{extension}")
+        if self.mode == "cprofile":
+            self._profiler.dump_stats(path)
+        else:
+            self._profiler.dump(path)
+        print(f"🐢 Slow turn ({elapsed:.2f}s), profile written to {path}")
+
+@contextlib.contextmanager
+def profile_if_slow(label, threshold=config.PROFILE_SLOW_TURN_SECONDS, mode=config.PROFILE_MODE):
+    """
+    Opt-in profiling: when `threshold` is set, profiles the block and, if it took longer
+    than `threshold` seconds, writes a cProfile `.prof` file (mode "cprofile", this thread
+    only) or collapsed stacks of every thread (mode "stacks") to PROFILE_FOLDER.
+    """
+    if not threshold:
+        yield
+        return
+    profiler = _TurnProfiler(mode)
+    profiler.resume()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        profiler.pause()
+        profiler.close(label, elapsed, threshold)
+
+def profile_iterator_if_slow(label, iterator, threshold=config.PROFILE_SLOW_TURN_SECONDS, mode=config.PROFILE_MODE):
+    """
+    profile_if_slow for a generator that yields to a UI, e.g. a Gradio handler: only the
+    work producing each item is profiled and counted against `threshold`, not the time
+    the consumer spends between items. Each item is profiled on the thread that asks
+    for it, so a generator resumed on another thread is still covered in cprofile mode.
+    """
+    if not threshold:
+        yield from iterator
+        return
+    profiler = _TurnProfiler(mode)
+    iterator = iter(iterator)
+    elapsed = 0.0
+    try:
+        while True:
+            profiler.resume()
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started
+                profiler.pause()
+            yield item
+    finally:
+        profiler.close(label, elapsed, threshold)
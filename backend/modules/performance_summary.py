@@ -0,0 +1,103 @@
+# modules/performance_summary.py
+import collections
+import threading
+import time
+import config
+from modules.llm_client import submit
+from modules.llm_handler import agenerate_performance_summary
+from modules.metrics import stage_timer
+
+class RollingSummarizer:
+    """
+    Keeps a compact running summary of one session's performance, updated in the
+    background after each evaluated answer, so the final feedback is written from the
+    summary plus the few answers it does not cover yet instead of the whole interview.
+    Updates run one at a time in the LLM's background lane. While one runs, only the
+    latest requested log is kept: the next update folds in every answer since, so a
+    session never has more than one update waiting. A failed update leaves its answers
+    for the next one.
+    """
+
+    def __init__(self, session_id, summary="", summarized_turns=0):
+        self.session_id = session_id
+        self.summary = summary
+        self.summarized_turns = summarized_turns  # leading interview_log entries the summary covers
+        self._pending = None   # the running update loop, if any
+        self._queued_log = None   # latest log requested while it runs
+        self._lock = threading.Lock()
+
+    async def _fold(self, interview_log):
+        with self._lock:
+            summary, start = self.summary, self.summarized_turns
+        new_turns = interview_log[start:]
+        if not new_turns:
+            return
+        try:
+            with stage_timer("performance_summary", self.session_id, len(interview_log)):
+                updated = await agenerate_performance_summary(summary, new_turns, start + 1)
+        except Exception as e:
+            print(f"💥 Performance summary update failed, retrying with the next answer: {e}")
+            return
+        with self._lock:
+            if self.summarized_turns == start:
+                self.summary, self.summarized_turns = updated, len(interview_log)
+
+    async def _run_updates(self):
+        while True:
+            with self._lock:
+                interview_log, self._queued_log = self._queued_log, None
+                if interview_log is None:
+                    self._pending = None
+                    return
+            await self._fold(interview_log)
+
+    def update(self, interview_log):
+        """Starts folding the answers the summary does not cover yet into it."""
+        with self._lock:
+            self._queued_log = list(interview_log)  # replaces a log an earlier call left waiting
+            if self._pending is None:
+                self._pending = submit(self._run_updates())
+
+    def snapshot(self):
+        """The summary as of the last finished update and how many answers it covers. Never waits."""
+        with self._lock:
+            return self.summary, self.summarized_turns
+
+    def cancel(self):
+        with self._lock:
+            self._queued_log = None
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+
+# Like the question prefetchers, summarizers of sessions that are never finished or
+# ended in this process are dropped once they have been idle for a session lifetime.
+_summarizers = collections.OrderedDict()  # session_id -> (expires_at, summarizer), least recently used first
+_registry_lock = threading.Lock()
+
+def _sweep_expired(now):
+    expired = []
+    with _registry_lock:
+        while _summarizers:
+            session_id, (expires_at, summarizer) = next(iter(_summarizers.items()))
+            if expires_at >= now:
+                break
+            del _summarizers[session_id]
+            expired.append(summarizer)
+    for summarizer in expired:
+        summarizer.cancel()
+
+def get_summarizer(session_id, summary="", summarized_turns=0):
+    now = time.time()
+    _sweep_expired(now)
+    with _registry_lock:
+        entry = _summarizers.pop(session_id, None)
+        summarizer = entry[1] if entry else RollingSummarizer(session_id, summary, summarized_turns)
+        _summarizers[session_id] = (now + config.SESSION_TTL_SECONDS, summarizer)
+        return summarizer
+
+def discard_summarizer(session_id):
+    with _registry_lock:
+        entry = _summarizers.pop(session_id, None)
+    if entry:
+        entry[1].cancel()
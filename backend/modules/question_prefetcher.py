@@ -0,0 +1,126 @@
+# modules/question_prefetcher.py
+import asyncio
+import collections
+import threading
+import time
+import regex as re
+import config
+from modules.llm_client import submit
+from modules.llm_handler import agenerate_question
+from modules.web_search import prefetch_example_answers
+
+class QuestionGenerationError(RuntimeError):
+    """Every attempt to generate the next question failed; asking again may succeed."""
+
+def _normalize(question):
+    return re.sub(r"[^\w]+", " ", question.lower()).strip()
+
+class QuestionPrefetcher:
+    """
+    Generates the next interview question in the background while the candidate is
+    still answering the current one, and remembers what has been asked so far.
+    A failed generation is retried; if every attempt fails, next_question raises
+    QuestionGenerationError and the next call starts over.
+    """
+
+    def __init__(self, interview_type, document_text, asked_questions=None, max_attempts=2):
+        self.interview_type = interview_type
+        self.document_text = document_text
+        self.max_attempts = max_attempts
+        self.asked_questions = list(asked_questions or [])
+        self._pending = None
+        self._lock = threading.Lock()
+
+    async def _generate(self):
+        asked = list(self.asked_questions)
+        seen = {_normalize(q) for q in asked}
+        for attempt in range(self.max_attempts):
+            # A retry must reach the model: the cache would return the same repeat again
+            try:
+                question = await agenerate_question(self.interview_type, self.document_text, asked,
+                                                    cache=attempt == 0, raise_errors=True)
+            except Exception as e:
+                if attempt == self.max_attempts - 1:
+                    raise QuestionGenerationError(f"Could not generate the next question: {e}") from e
+                print(f"💥 Question generation failed, asking again: {e}")
+                continue
+            if _normalize(question) not in seen:
+                break
+            print("🔁 Generated a repeated question, asking again.")
+        # Example answers are looked up while the candidate is still answering
+        prefetch_example_answers(question)
+        return question
+
+    def prefetch(self):
+        """Starts generating the next question unless one is already on its way."""
+        with self._lock:
+            if self._pending is None:
+                self._pending = submit(self._generate())
+
+    def next_question(self):
+        """Returns the prefetched question (waiting for it if needed) and marks it as asked."""
+        self.prefetch()
+        with self._lock:
+            pending, self._pending = self._pending, None
+        question = pending.result()
+        self.asked_questions.append(question)
+        return question
+
+    async def anext_question(self):
+        """Like next_question, for callers on another event loop: awaits instead of blocking."""
+        self.prefetch()
+        with self._lock:
+            pending, self._pending = self._pending, None
+        question = await asyncio.wrap_future(pending)
+        self.asked_questions.append(question)
+        return question
+
+    def cancel(self):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+
+# Sessions that are abandoned, expire or finish on another worker are never discarded
+# here, so prefetchers idle for longer than a session lives are dropped as well.
+_prefetchers = collections.OrderedDict()  # session_id -> (expires_at, prefetcher), least recently used first
+_registry_lock = threading.Lock()
+
+def _sweep_expired(now):
+    expired = []
+    with _registry_lock:
+        while _prefetchers:
+            session_id, (expires_at, prefetcher) = next(iter(_prefetchers.items()))
+            if expires_at >= now:
+                break
+            del _prefetchers[session_id]
+            expired.append(prefetcher)
+    for prefetcher in expired:
+        prefetcher.cancel()
+
+def get_prefetcher(session_id, interview_type, document_text, asked_questions=None):
+    """
+    Returns the session's prefetcher. One that has fallen behind `asked_questions`
+    (another worker served turns since) is rebuilt, so its pending question, generated
+    without knowing about them, is never asked.
+    """
+    now = time.time()
+    _sweep_expired(now)
+    stale = None
+    with _registry_lock:
+        entry = _prefetchers.pop(session_id, None)
+        prefetcher = entry[1] if entry else None
+        if prefetcher and len(prefetcher.asked_questions) != len(asked_questions or []):
+            stale, prefetcher = prefetcher, None
+        if prefetcher is None:
+            prefetcher = QuestionPrefetcher(interview_type, document_text, asked_questions)
+        _prefetchers[session_id] = (now + config.SESSION_TTL_SECONDS, prefetcher)
+    if stale:
+        stale.cancel()
+    return prefetcher
+
+def discard_prefetcher(session_id):
+    with _registry_lock:
+        entry = _prefetchers.pop(session_id, None)
+    if entry:
+        entry[1].cancel()
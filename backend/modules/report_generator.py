@@ -1,16 +1,21 @@
 # modules/report_generator.py
 
 import datetime
-import os
+import threading
+import io
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Frame, PageTemplate
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 # --- THIS IS THE FIX: Import TA_LEFT ---
 from reportlab.lib.enums import TA_JUSTIFY, TA_CENTER, TA_LEFT
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-from modules.llm_handler import generate_holistic_feedback, parse_scores_from_evaluation
+from modules.llm_handler import agenerate_holistic_feedback, interview_log_text
+from modules.evaluation_schema import SCORE_CATEGORIES, parse_scores_from_evaluation
+from modules.llm_client import submit
+from modules.job_queue import get_job_queue
 import config
 
 # The rest of the file remains the same...
@@ -28,36 +33,73 @@ class ReportPageTemplate(PageTemplate):
         canvas.drawCentredString(doc.width / 2 + inch, 0.75 * inch, footer_text)
         canvas.restoreState()
 
-def create_radar_chart(labels, scores, file_path):
-    num_vars = len(labels)
-    angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-    scores += scores[:1]; angles += angles[:1]
-    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    ax.fill(angles, scores, color='#4A90E2', alpha=0.2)
-    ax.plot(angles, scores, color='#4A90E2', linewidth=2, linestyle='solid')
-    ax.set_yticklabels([]); ax.set_xticks(angles[:-1]); ax.set_xticklabels(labels, size=12, color='grey')
-    ax.set_ylim(0, 10)
-    for angle, score in zip(angles[:-1], scores[:-1]):
-        ax.text(angle, score + 1.5, str(score), ha='center', va='center', size=14, color="#000000", weight='bold')
-    plt.title('Performance Snapshot', size=20, color='#333333', y=1.1)
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    plt.savefig(file_path, transparent=True, dpi=150)
-    plt.close(fig)
-    print(f"📈 Radar chart saved to {file_path}")
-
-def generate_pdf_report(interview_data, file_path):
-    doc = SimpleDocTemplate(file_path, pagesize=(8.5 * inch, 11 * inch),
-                            leftMargin=inch, rightMargin=inch, topMargin=inch, bottomMargin=inch)
-    doc.addPageTemplates([ReportPageTemplate('main_template', (8.5 * inch, 11 * inch))])
-    
+class RadarChartTemplate:
+    """
+    A preconfigured polar figure for one set of labels. Only the data artists are
+    replaced between renders; the figure, axes, ticks and title are built once.
+    Uses the object-oriented Figure/Agg API, so no pyplot global state is involved.
+    """
+
+    def __init__(self, labels):
+        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+        self.figure = Figure(figsize=(6, 6))
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(polar=True)
+        self.ax.set_yticklabels([]); self.ax.set_xticks(angles); self.ax.set_xticklabels(labels, size=12, color='grey')
+        self.ax.set_ylim(0, 10)
+        self.ax.set_title('Performance Snapshot', size=20, color='#333333', y=1.1)
+        self.angles = angles + angles[:1]
+        self._data_artists = []
+
+    def render_png(self, scores):
+        """`scores` has one value per label; None leaves that axis out of the shape."""
+        for artist in self._data_artists:
+            artist.remove()
+        scored = [(angle, score) for angle, score in zip(self.angles[:-1], scores) if score is not None]
+        angles = [angle for angle, _ in scored]
+        scores = [score for _, score in scored]
+        closed_angles, closed_scores = angles + angles[:1], scores + scores[:1]
+        artists = self.ax.fill(closed_angles, closed_scores, color='#4A90E2', alpha=0.2)
+        artists += self.ax.plot(closed_angles, closed_scores, color='#4A90E2', linewidth=2, linestyle='solid')
+        for angle, score in scored:
+            artists.append(self.ax.text(angle, score + 1.5, str(score), ha='center', va='center', size=14, color="#000000", weight='bold'))
+        self._data_artists = artists
+        buffer = io.BytesIO()
+        self.figure.savefig(buffer, format='png', transparent=True, dpi=150)
+        return buffer.getvalue()
+
+# Each thread (in practice, each job queue worker) keeps its own templates
+_chart_templates = threading.local()
+
+def create_radar_chart(labels, scores):
+    """Renders the radar chart and returns it as PNG bytes. A score of None is left unplotted."""
+    templates = getattr(_chart_templates, 'by_labels', None)
+    if templates is None:
+        templates = _chart_templates.by_labels = {}
+    key = tuple(labels)
+    if key not in templates:
+        templates[key] = RadarChartTemplate(labels)
+    return templates[key].render_png(list(scores))
+
+def _report_styles():
     styles = getSampleStyleSheet()
-    
     styles.add(ParagraphStyle(name='ReportTitle', parent=styles['h1'], fontSize=28, alignment=TA_CENTER, spaceAfter=24))
     styles.add(ParagraphStyle(name='ReportSubTitle', parent=styles['h2'], fontSize=16, alignment=TA_CENTER, spaceAfter=12, textColor=colors.HexColor('#555555')))
     styles.add(ParagraphStyle(name='Justify', alignment=TA_JUSTIFY, spaceAfter=12, leading=14))
     styles.add(ParagraphStyle(name='MainHeader', parent=styles['h1'], fontSize=22, spaceBefore=12, spaceAfter=20, alignment=TA_LEFT, textColor=colors.HexColor('#2c3e50')))
     styles.add(ParagraphStyle(name='QuestionTitle', parent=styles['h2'], spaceBefore=20, spaceAfter=10, textColor=colors.HexColor('#2980b9')))
     styles.add(ParagraphStyle(name='SectionTitle', parent=styles['h3'], spaceBefore=12, spaceAfter=6, textColor=colors.HexColor('#34495e')))
+    return styles
+
+def build_pdf_document(interview_data, holistic_feedback, chart_png, file_path):
+    """
+    Lays out and writes the PDF once the feedback and chart are ready. CPU-bound, so
+    generate_pdf_report runs it in a job queue worker process.
+    """
+    doc = SimpleDocTemplate(file_path, pagesize=(8.5 * inch, 11 * inch),
+                            leftMargin=inch, rightMargin=inch, topMargin=inch, bottomMargin=inch)
+    doc.addPageTemplates([ReportPageTemplate('main_template', (8.5 * inch, 11 * inch))])
+    styles = _report_styles()
 
     story = []
 
@@ -71,25 +113,12 @@ def generate_pdf_report(interview_data, file_path):
     story.append(PageBreak())
 
     story.append(Paragraph("Overall Performance Analysis", styles['MainHeader']))
-    full_log_text = ""
-    all_scores = []
-    skill_labels = ['Factual Accuracy', 'Relevance & Directness', 'Structure & Clarity']
-    for i, qa in enumerate(interview_data['q_and_a']):
-        full_log_text += f"Q{i+1}: {qa['question']}\nA: {qa['answer']}\n---\n"
-        scores = parse_scores_from_evaluation(qa['evaluation'])
-        all_scores.append([scores.get(label, 0) for label in skill_labels])
-    holistic_feedback = generate_holistic_feedback(full_log_text).replace('\n', '<br/>')
-    story.append(Paragraph(holistic_feedback, styles['Justify']))
+    story.append(Paragraph(holistic_feedback.replace('\n', '<br/>'), styles['Justify']))
     story.append(Spacer(1, 0.3 * inch))
+    if chart_png:
+        story.append(Image(io.BytesIO(chart_png), width=4.5*inch, height=4.5*inch, hAlign='CENTER'))
 
-    if all_scores:
-        avg_scores = np.mean(all_scores, axis=0).tolist()
-        chart_path = os.path.join(config.REPORT_FOLDER, "skill_chart.png")
-        if os.path.exists(chart_path): os.remove(chart_path)
-        create_radar_chart(skill_labels, avg_scores, chart_path)
-        story.append(Image(chart_path, width=4.5*inch, height=4.5*inch, hAlign='CENTER'))
     story.append(PageBreak())
-
     story.append(Paragraph("Detailed Question Analysis", styles['MainHeader']))
     for i, qa in enumerate(interview_data['q_and_a']):
         story.append(Paragraph(f"Question {i+1}: {qa['question']}", styles['QuestionTitle']))
@@ -102,4 +131,48 @@ def generate_pdf_report(interview_data, file_path):
         doc.build(story)
         print(f"\n✅ Professional report generated successfully: {file_path}")
     except Exception as e:
-        print(f"💥 Error generating professional PDF report: {e}")
\ No newline at end of file
+        print(f"💥 Error generating professional PDF report: {e}")
+        raise
+
+def generate_pdf_report(interview_data, file_path, owner=None):
+    """
+    Builds the PDF report. The holistic-feedback LLM call runs on the LLM loop while the
+    chart renders in the job queue's background lane; the layout and doc.build follow
+    there too, so report builds neither hold the web process's GIL nor delay live turns.
+    `owner` (e.g. the session id) lets the queue cancel the jobs that have not started.
+    """
+    q_and_a = interview_data['q_and_a']
+    # Sessions keep a running performance summary, so the prompt stays about the same size
+    # however many questions were asked; reports requested through the API send the full log
+    summary = interview_data.get('performance_summary')
+    covered = interview_data.get('summarized_turns', 0) if summary else 0
+    feedback_future = submit(agenerate_holistic_feedback(interview_log_text(q_and_a[covered:], covered + 1), summary))
+
+    # Scores are stored when each answer is evaluated; only logs from older sessions or
+    # API callers without them fall back to parsing the evaluation text
+    categories = list(SCORE_CATEGORIES.values())
+    per_category = {name: [] for name in categories}
+    for qa in q_and_a:
+        scores = qa.get('scores') or parse_scores_from_evaluation(qa.get('evaluation', ''))
+        for name in categories:
+            if scores.get(name) is not None:
+                per_category[name].append(scores[name])
+    job_queue = get_job_queue()
+    chart_job = None
+    if any(per_category.values()):
+        # Missing scores are left out of the average instead of counting as 0, and a
+        # category with no scores at all is marked N/A rather than plotted at 0
+        avg_scores = [round(float(np.mean(values)), 1) if values else None for values in per_category.values()]
+        skill_labels = [name.split(' (')[0] + ('' if values else '\n(N/A)') for name, values in per_category.items()]
+        chart_job = job_queue.submit(create_radar_chart, skill_labels, avg_scores,
+                                     lane="background", owner=owner, kind="report_chart")
+
+    try:
+        holistic_feedback = feedback_future.result()
+    except BaseException:
+        if chart_job:
+            chart_job.cancel()
+        raise
+    chart_png = chart_job.result() if chart_job else None
+    job_queue.submit(build_pdf_document, interview_data, holistic_feedback, chart_png, file_path,
+                     lane="background", owner=owner, kind="report_pdf").result()
@@ -0,0 +1,114 @@
+# modules/report_jobs.py
+import concurrent.futures
+import collections
+import threading
+import hashlib
+import json
+import time
+import os
+import regex as re
+import config
+from modules.metrics import stage_timer
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=config.REPORT_WORKERS, thread_name_prefix="report")
+_jobs = collections.OrderedDict()  # job_id -> job record, oldest first
+_jobs_lock = threading.Lock()
+
+def report_job_id(interview_data):
+    """Reports are keyed by their content, so the same interview always maps to the same job and file."""
+    content = {key: interview_data.get(key) for key in ('name', 'type', 'q_and_a')}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+def _report_path(job_id, name):
+    safe_name = re.sub(r'[^\w-]+', '_', name or 'User').strip('_') or 'User'
+    return os.path.join(config.REPORT_FOLDER, f"Report_{safe_name}_{job_id[:12]}.pdf")
+
+_UNFINISHED = ('queued', 'running')
+
+def _update_job(job, **fields):
+    # Job records are read by status requests on other threads
+    with _jobs_lock:
+        job.update(fields)
+
+def _run_job(job, owner):
+    # matplotlib and ReportLab are only loaded once the first report is requested
+    from modules.report_generator import generate_pdf_report
+    with _jobs_lock:
+        job['status'] = 'running'
+        interview_data = job.pop('interview_data')
+    started = time.perf_counter()
+    tmp_path = os.path.splitext(job['file_path'])[0] + '.part.pdf'
+    try:
+        os.makedirs(config.REPORT_FOLDER, exist_ok=True)
+        with stage_timer("pdf_build"):
+            generate_pdf_report(interview_data, tmp_path, owner=owner)
+        os.replace(tmp_path, job['file_path'])
+        outcome = {'status': 'done'}
+    except concurrent.futures.CancelledError:
+        # The session ended before its report jobs reached a worker
+        outcome = {'status': 'cancelled'}
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    except Exception as e:
+        outcome = {'status': 'failed', 'error': str(e)}
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _update_job(job, seconds=time.perf_counter() - started, **outcome)
+    return job['file_path']
+
+def submit_report(interview_data, owner=None):
+    """
+    Starts building the PDF report in the background and returns its job ID.
+    A report that was already built (or is being built) is not generated again.
+    `owner` is passed on to the job queue, see generate_pdf_report.
+    """
+    job_id = report_job_id(interview_data)
+    file_path = _report_path(job_id, interview_data.get('name'))
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job and job['status'] not in ('failed', 'cancelled') and (job['status'] != 'done' or os.path.exists(file_path)):
+            _jobs.move_to_end(job_id)
+            return job_id
+
+        job = {'job_id': job_id, 'file_path': file_path, 'created': time.time()}
+        if os.path.exists(file_path):
+            job['status'] = 'done'
+            job['future'] = concurrent.futures.Future()
+            job['future'].set_result(file_path)
+        else:
+            job['status'] = 'queued'
+            job['interview_data'] = interview_data
+            job['future'] = _executor.submit(_run_job, job, owner)
+        _jobs[job_id] = job
+        # Only finished jobs are forgotten: a caller may still be waiting on an unfinished one
+        excess = len(_jobs) - config.REPORT_JOB_HISTORY
+        if excess > 0:
+            finished = [old_id for old_id, old_job in _jobs.items() if old_job['status'] not in _UNFINISHED]
+            for old_id in finished[:excess]:
+                del _jobs[old_id]
+    return job_id
+
+def get_report_job(job_id):
+    """Returns the public view of a job: status, error and build time, or None if unknown."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {key: job[key] for key in ('job_id', 'status', 'error', 'seconds') if key in job}
+
+def report_file_path(job_id):
+    """Returns where a finished report is stored on this server, or None if it is not done."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None or job['status'] != 'done':
+            return None
+        return job['file_path']
+
+def wait_for_report(job_id, timeout=None):
+    """Blocks until the report is built and returns its path, or None if the job failed or was cancelled."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+    job['future'].result(timeout)
+    return job['file_path'] if job['status'] == 'done' else None
@@ -0,0 +1,128 @@
+# modules/session_store.py
+import collections
+import threading
+import sqlite3
+import json
+import time
+import zlib
+import os
+import config
+
+# Session records are plain dicts, stored as zlib-compressed compact JSON so that any
+# backend (and any worker process) can read what another one wrote.
+
+def encode_session(record):
+    return zlib.compress(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+
+def decode_session(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+class MemorySessionStore:
+    """In-process LRU with TTL. Only shared by threads of one process."""
+
+    def __init__(self, ttl=config.SESSION_TTL_SECONDS, max_sessions=config.SESSION_MAX_IN_MEMORY):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = collections.OrderedDict()  # session_id -> (expires_at, blob)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return decode_session(entry[1])
+
+    def put(self, session_id, record):
+        blob = encode_session(record)
+        with self._lock:
+            self._sessions[session_id] = (time.time() + self.ttl, blob)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path=config.SESSION_SQLITE_PATH, ttl=config.SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?", (session_id, time.time())).fetchone()
+        return decode_session(row[0]) if row else None
+
+    def put(self, session_id, record):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                         (session_id, encode_session(record), now + self.ttl))
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+
+    def delete(self, session_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+class RedisSessionStore:
+    """
+    Sessions in Redis, shared across hosts. `client` may be anything with Redis'
+    get/set(ex=)/delete methods, e.g. a local stand-in such as fakeredis.
+    """
+
+    def __init__(self, client=None, url=config.SESSION_REDIS_URL, ttl=config.SESSION_TTL_SECONDS, prefix='interview:session:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, session_id):
+        blob = self.client.get(self.prefix + session_id)
+        return decode_session(blob) if blob else None
+
+    def put(self, session_id, record):
+        self.client.set(self.prefix + session_id, encode_session(record), ex=int(self.ttl))
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+BACKENDS = {'memory': MemorySessionStore, 'sqlite': SQLiteSessionStore, 'redis': RedisSessionStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BACKENDS[config.SESSION_BACKEND]()
+        return _store
+
+def set_session_store(store):
+    """Replaces the shared store, e.g. with a RedisSessionStore around a local stand-in."""
+    global _store
+    with _store_lock:
+        _store = store
@@ -1,32 +1,324 @@
 # modules/stt_handler.py
-import speech_recognition as sr
+import numpy as np
+import concurrent.futures
+import collections
+import threading
+import queue
+import time
+import io
 import os
+import wave
+import config
+from modules.metrics import get_metrics_registry
+from modules.job_queue import get_stt_job_queue
 
-def transcribe_audio(audio_filepath):
+WHISPER_SAMPLE_RATE = 16000
+
+def _load_whisper_model(model_size):
+    import whisper
+    return whisper.load_model(model_size)
+
+_worker_models = {}   # (model loader, model size) -> model, in a job queue worker process
+
+def _limit_torch_threads():
+    # torch defaults to one thread per core in every worker process
+    try:
+        import torch
+    except ImportError:
+        return  # a model loader that does not use torch
+    torch.set_num_threads(config.STT_TORCH_THREADS)
+
+def _transcribe_in_worker(model_loader, model_size, audio):
+    """Runs in a job queue worker: returns the text and the model load and inference seconds."""
+    load_started = time.perf_counter()
+    if (model_loader, model_size) not in _worker_models:
+        print(f"Loading Whisper model '{model_size}' in worker {os.getpid()}...")
+        _limit_torch_threads()
+        _worker_models[model_loader, model_size] = model_loader(model_size)
+    load_time = time.perf_counter() - load_started
+
+    inference_started = time.perf_counter()
+    output = _worker_models[model_loader, model_size].transcribe(audio, language="english", fp16=False)
+    return output.get("text", "").strip(), load_time, time.perf_counter() - inference_started
+
+class STTEngine:
+    """
+    Process-wide Whisper engine. Requests wait in a bounded queue for one of the worker
+    threads. With a job queue, each thread hands its transcription to the queue's worker
+    processes, which keep their own warm models (model_loader is then sent to them, so it
+    must be a module-level function); otherwise each thread keeps its own warm copy of
+    every model size it has served (Whisper installs decoding hooks on the model, so one
+    instance must not run two transcriptions at once).
+    """
+
+    def __init__(self, num_workers=config.STT_NUM_WORKERS, queue_size=config.STT_QUEUE_SIZE,
+                 model_loader=_load_whisper_model, job_queue=None):
+        self.model_loader = model_loader
+        self.job_queue = job_queue
+        self.num_workers = num_workers
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._workers = []
+        for i in range(num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"stt-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self):
+        models = {}
+        while True:
+            audio, model_size, owner, submitted, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                self._jobs.task_done()  # cancelled while it waited, e.g. the stream failed
+                continue
+            result = {"text": "", "timings": {"queue": 0.0, "load": 0.0, "inference": 0.0}}
+            try:
+                result["timings"]["queue"] = time.perf_counter() - submitted
+                if self.job_queue is not None:
+                    job = self.job_queue.submit(_transcribe_in_worker, self.model_loader, model_size, audio,
+                                                owner=owner, kind="stt")
+                    result["text"], result["timings"]["load"], result["timings"]["inference"] = job.result()
+                    future.set_result(result)
+                    continue
+                load_started = time.perf_counter()
+                if model_size not in models:
+                    print(f"Loading Whisper model '{model_size}'...")
+                    models[model_size] = self.model_loader(model_size)
+                result["timings"]["load"] = time.perf_counter() - load_started
+
+                inference_started = time.perf_counter()
+                output = models[model_size].transcribe(audio, language="english", fp16=False)
+                result["timings"]["inference"] = time.perf_counter() - inference_started
+                result["text"] = output.get("text", "").strip()
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._jobs.task_done()
+
+    def warm_up(self, model_size=config.WHISPER_MODEL_SIZE):
+        """Runs one second of silence through every worker so the first real turn finds them loaded."""
+        silence = np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32)
+        if self.job_queue is not None:
+            # All at once, so that each worker process picks one up and loads its model
+            jobs = [self.job_queue.submit(_transcribe_in_worker, self.model_loader, model_size, silence, kind="stt")
+                    for _ in range(self.job_queue.workers)]
+            for job in jobs:
+                job.result()
+            return
+        for _ in self._workers:
+            self.transcribe_array(silence, model_size)
+
+    def submit_array(self, audio, model_size=config.WHISPER_MODEL_SIZE, timeout=config.STT_TIMEOUT_SECONDS, owner=None):
+        """
+        Queues a mono float32 array sampled at 16 kHz for transcription and returns a
+        concurrent.futures.Future of the dict transcribe_array returns. `owner` (e.g. a
+        session id) lets the job queue cancel the transcription if it has not started
+        when the session ends.
+        """
+        future = concurrent.futures.Future()
+        try:
+            self._jobs.put((audio, model_size, owner, time.perf_counter(), future), timeout=timeout)
+        except queue.Full:
+            raise RuntimeError("STT engine is busy, try again shortly")
+        future.add_done_callback(_observe_timings)
+        return future
+
+    def transcribe_array(self, audio, model_size=config.WHISPER_MODEL_SIZE, timeout=config.STT_TIMEOUT_SECONDS, owner=None):
+        """
+        Transcribes a mono float32 array sampled at 16 kHz. Returns a dict with the text
+        and the per-stage timings in seconds.
+        """
+        future = self.submit_array(audio, model_size, timeout, owner)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError(f"Transcription did not finish within {timeout}s")
+
+def _observe_timings(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    for phase, seconds in future.result()["timings"].items():
+        get_metrics_registry().observe("stt_phase_seconds", seconds, "Whisper queue wait, model load and inference per segment", phase=phase)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_stt_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = STTEngine(job_queue=get_stt_job_queue())
+        return _engine
+
+def set_stt_engine(engine):
+    """Replaces the shared engine, e.g. with one around a fake model in benchmarks."""
+    global _engine
+    with _engine_lock:
+        _engine = engine
+
+def load_audio_for_whisper(audio_filepath):
+    """Reads an audio file and returns it as a mono 16 kHz float32 array, as Whisper expects."""
+    import speech_recognition as sr
+    import soundfile as sf
+    with sr.AudioFile(audio_filepath) as source:
+        audio_data = sr.Recognizer().record(source)
+    wav_bytes = audio_data.get_wav_data(convert_rate=WHISPER_SAMPLE_RATE, convert_width=2)
+    audio, _ = sf.read(io.BytesIO(wav_bytes), dtype="float32")
+    return audio
+
+def transcribe_audio_with_timings(audio_filepath, engine=None, delete_after=True, owner=None):
+    """
+    Transcribes an audio file on the shared STT engine. Returns a dict with the text and
+    the decode/queue/load/inference timings in seconds.
+    """
     if not audio_filepath or not os.path.exists(audio_filepath):
         print("STT Error: No audio file provided or file does not exist.")
-        return "[Transcription error: Invalid audio file path]"
-    
-    recognizer = sr.Recognizer()
+        return {"text": "[Transcription error: Invalid audio file path]", "timings": {}}
+
     try:
-        with sr.AudioFile(audio_filepath) as source:
-            audio_data = recognizer.record(source)
-            print("Transcribing with Whisper...")
-            text = recognizer.recognize_whisper(audio_data, language="english")
-            print(f"User transcribed as: {text}")
-            return text
-    except sr.UnknownValueError:
-        print("STT Error: Whisper could not understand the audio.")
-        return "[Could not understand audio]"
-    except sr.RequestError as e:
-        print(f"STT Error: Could not request results from Whisper service; {e}")
-        return f"[Transcription error: Whisper service issue - {e}]"
+        decode_started = time.perf_counter()
+        audio = load_audio_for_whisper(audio_filepath)
+        decode_time = time.perf_counter() - decode_started
+
+        print("Transcribing with Whisper...")
+        result = (engine or get_stt_engine()).transcribe_array(audio, owner=owner)
+        result["timings"]["decode"] = decode_time
+        if not result["text"]:
+            print("STT Error: Whisper could not understand the audio.")
+            result["text"] = "[Could not understand audio]"
+        else:
+            print(f"User transcribed as: {result['text']}")
+        print(f"STT timings: {', '.join(f'{k}={v:.2f}s' for k, v in result['timings'].items())}")
+        return result
     except Exception as e:
         print(f"STT Error: An unexpected error occurred during transcription: {e}")
-        return f"[Transcription error: {e}]"
+        return {"text": f"[Transcription error: {e}]", "timings": {}}
     finally:
-        if os.path.exists(audio_filepath):
+        if delete_after and os.path.exists(audio_filepath):
             try:
                 os.remove(audio_filepath)
             except OSError as e:
-                print(f"Error deleting temp audio file {audio_filepath}: {e}")
\ No newline at end of file
+                print(f"Error deleting temp audio file {audio_filepath}: {e}")
+
+def transcribe_audio(audio_filepath, engine=None, delete_after=True, owner=None):
+    return transcribe_audio_with_timings(audio_filepath, engine, delete_after, owner)["text"]
+
+# --- Streaming transcription ---
+
+VAD_FRAME_SECONDS = 0.03
+
+def _pcm_to_float_mono(frames, sample_width, channels):
+    if sample_width == 3:
+        # 24-bit little-endian: place each sample in the top three bytes of an int32
+        padded = np.zeros((len(frames) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = padded.view("<i4").reshape(-1).astype(np.float32) / float(np.iinfo(np.int32).max)
+    elif sample_width in (1, 2, 4):
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[sample_width]
+        samples = np.frombuffer(frames, dtype=dtype).astype(np.float32)
+        if sample_width == 1:
+            samples = (samples - 128.0) / 128.0
+        else:
+            samples /= float(np.iinfo(dtype).max)
+    else:
+        raise wave.Error(f"unsupported sample width: {sample_width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+def _resample(samples, from_rate, to_rate=WHISPER_SAMPLE_RATE):
+    if from_rate == to_rate or len(samples) == 0:
+        return samples
+    target_len = int(round(len(samples) * to_rate / from_rate))
+    positions = np.linspace(0, len(samples) - 1, num=target_len)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def iter_speech_segments(audio_filepath, max_segment_seconds=config.STT_STREAM_WINDOW_SECONDS,
+                         silence_seconds=config.STT_STREAM_SILENCE_SECONDS,
+                         energy_threshold=config.STT_VAD_ENERGY_THRESHOLD):
+    """
+    Reads a WAV file in 30 ms frames and yields 16 kHz float32 segments of speech.
+    Silence before speech is dropped, a segment is closed after a pause or once it
+    reaches max_segment_seconds, so at most one segment is held in memory at a time.
+    """
+    with wave.open(audio_filepath, "rb") as wav:
+        rate, width, channels = wav.getframerate(), wav.getsampwidth(), wav.getnchannels()
+        frames_per_chunk = max(1, int(rate * VAD_FRAME_SECONDS))
+        max_chunks = int(max_segment_seconds / VAD_FRAME_SECONDS)
+        pause_chunks = int(silence_seconds / VAD_FRAME_SECONDS)
+
+        segment, trailing_silence, has_speech = [], 0, False
+        while True:
+            frames = wav.readframes(frames_per_chunk)
+            if not frames:
+                break
+            chunk = _pcm_to_float_mono(frames, width, channels)
+            is_speech = float(np.sqrt(np.mean(chunk ** 2))) >= energy_threshold
+
+            if not has_speech and not is_speech:
+                continue
+            segment.append(chunk)
+            has_speech = True
+            trailing_silence = 0 if is_speech else trailing_silence + 1
+
+            if trailing_silence >= pause_chunks or len(segment) >= max_chunks:
+                yield _resample(np.concatenate(segment[:len(segment) - trailing_silence]), rate)
+                segment, trailing_silence, has_speech = [], 0, False
+
+        if has_speech:
+            yield _resample(np.concatenate(segment[:len(segment) - trailing_silence]), rate)
+
+def stream_transcribe(audio_filepath, engine=None, delete_after=True, owner=None):
+    """
+    Transcribes a recorded answer segment by segment. Segments are transcribed
+    concurrently, up to one per engine worker, while later ones are still being cut
+    from the file; the transcript is assembled in order. Yields dicts with the transcript
+    so far and an is_final flag; the last item is always final. `owner` is passed on to
+    the engine, see STTEngine.submit_array. Segmentation starts once the recording is
+    complete: the Gradio recorder hands over a finished file.
+    """
+    engine = engine or get_stt_engine()
+    parts, pending = [], collections.deque()
+
+    def finished_parts(wait):
+        # Pops transcriptions off the front in order: all of them if `wait`, else those already done
+        while pending and (wait or pending[0].done()):
+            text = pending.popleft().result(config.STT_TIMEOUT_SECONDS)["text"]
+            if text:
+                parts.append(text)
+                yield {"text": " ".join(parts), "is_final": False}
+
+    try:
+        if not audio_filepath or not os.path.exists(audio_filepath):
+            print("STT Error: No audio file provided or file does not exist.")
+            yield {"text": "[Transcription error: Invalid audio file path]", "is_final": True}
+            return
+        print("Transcribing with Whisper (streaming)...")
+        for segment in iter_speech_segments(audio_filepath):
+            if len(pending) >= max(1, engine.num_workers):
+                pending[0].result(config.STT_TIMEOUT_SECONDS)
+            pending.append(engine.submit_array(segment, owner=owner))
+            yield from finished_parts(wait=False)
+        yield from finished_parts(wait=True)
+    except wave.Error:
+        # Not a PCM WAV we can read (e.g. an uploaded mp3), fall back to the whole-file path
+        for future in pending:
+            future.cancel()
+        yield {"text": transcribe_audio(audio_filepath, engine, delete_after=False, owner=owner), "is_final": True}
+        return
+    except Exception as e:
+        for future in pending:
+            future.cancel()
+        print(f"STT Error: An unexpected error occurred during transcription: {e}")
+        yield {"text": f"[Transcription error: {e}]", "is_final": True}
+        return
+    finally:
+        if delete_after and audio_filepath and os.path.exists(audio_filepath):
+            try:
+                os.remove(audio_filepath)
+            except OSError as e:
+                print(f"Error deleting temp audio file {audio_filepath}: {e}")
+
+    text = " ".join(parts) if parts else "[Could not understand audio]"
+    print(f"User transcribed as: {text}")
+    yield {"text": text, "is_final": True}
@@ -1,31 +1,295 @@
 # modules/tts_handler.py
 import subprocess
-import platform
-import sys
+import threading
+import collections
+import hashlib
+import tempfile
+import shutil
+import queue
+import time
+import uuid
+import json
+import wave
+import re
 import os
 import config
-from pydub import AudioSegment
-import tempfile
+from modules.metrics import stage_timer
 
-def text_to_speech_file(text_to_speak):
-    print(f"AI generating audio for: {text_to_speak}")
-    piper_executable = 'piper'  # Use system PATH
+def _read_sample_rate(model_path, default=22050):
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".raw") as raw_file:
-            raw_filename = raw_file.name
+        with open(f"{model_path}.json", encoding="utf-8") as f:
+            return int(json.load(f)["audio"]["sample_rate"])
+    except (OSError, KeyError, ValueError):
+        return default
+
+class PiperCLIWorker:
+    """
+    One long-lived `piper` CLI process. In --output_dir mode it reads one utterance per
+    line on stdin and answers with the path of the WAV file it wrote, so the voice model
+    is loaded once per process rather than once per utterance.
+    """
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.output_dir = tempfile.mkdtemp(prefix="piper-")
+        self._process = None
+
+    def _start(self):
+        self._process = subprocess.Popen(['piper', '--model', self.model_path, '--output_dir', self.output_dir],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    def synthesize(self, text):
+        """Returns 16-bit mono PCM for the given text. Not thread-safe: one caller at a time."""
+        for attempt in range(2):
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            try:
+                self._process.stdin.write(" ".join(text.split()) + "\n")
+                self._process.stdin.flush()
+                wav_path = self._process.stdout.readline().strip()
+            except (BrokenPipeError, OSError):
+                wav_path = ""
+            if wav_path:
+                try:
+                    with wave.open(wav_path, "rb") as wav:
+                        return wav.readframes(wav.getnframes())
+                finally:
+                    os.remove(wav_path)
+            self.close()  # the process died mid-utterance; start a fresh one once
+        raise RuntimeError("piper CLI produced no audio")
+
+    def close(self):
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+class PiperSynthesizer:
+    """
+    Keeps a small pool of loaded Piper voices so the ONNX model is read once, not once
+    per utterance. Falls back to long-lived `piper` CLI processes when the piper Python
+    package is not importable.
+    """
+
+    def __init__(self, model_path=config.PIPER_VOICE_MODEL, num_workers=config.TTS_NUM_WORKERS):
+        self.model_path = model_path
+        self.sample_rate = _read_sample_rate(model_path)
+        self._voices = queue.Queue()
+        try:
+            from piper.voice import PiperVoice
+            for _ in range(num_workers):
+                self._voices.put(PiperVoice.load(model_path))
+            print(f"🔊 Loaded {num_workers} Piper voice worker(s) from {model_path}")
+        except ImportError:
+            for _ in range(num_workers):
+                self._voices.put(PiperCLIWorker(model_path))
+            print(f"Piper Python package not found, using {num_workers} long-lived piper CLI process(es).")
+
+    def synthesize(self, text):
+        """Returns 16-bit mono PCM for the given text."""
+        voice = self._voices.get()
+        try:
+            if isinstance(voice, PiperCLIWorker):
+                return voice.synthesize(text)
+            if hasattr(voice, "synthesize_stream_raw"):
+                return b"".join(voice.synthesize_stream_raw(text))
+            return b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(text))
+        finally:
+            self._voices.put(voice)
+
+def write_wav(file_obj, pcm, sample_rate):
+    """Writes a WAV header followed by the 16-bit mono PCM bytes."""
+    with wave.open(file_obj, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+
+class TTSCache:
+    """
+    Content-addressed LRU cache of synthesized WAV files on disk, keyed by
+    (voice model, text) and capped at max_bytes in total. Callers get a hard link (or
+    copy) in output_folder rather than the cached file, so evicting an entry never
+    deletes audio that is still being served; those links expire after output_ttl.
+    """
+
+    def __init__(self, folder=config.TTS_CACHE_FOLDER, max_bytes=config.TTS_CACHE_MAX_BYTES,
+                 output_folder=config.TTS_OUTPUT_FOLDER, output_ttl=config.TTS_OUTPUT_TTL_SECONDS):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.output_folder = output_folder
+        self.output_ttl = output_ttl
+        self._next_sweep = 0.0
+        self._entries = collections.OrderedDict()  # key -> size in bytes, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        os.makedirs(output_folder, exist_ok=True)
+        existing = [e for e in os.scandir(folder) if e.name.endswith(".wav")]
+        for entry in sorted(existing, key=lambda e: e.stat().st_mtime):
+            self._entries[entry.name[:-4]] = entry.stat().st_size
+            self._total_bytes += entry.stat().st_size
+
+    @staticmethod
+    def key_for(model_path, text):
+        return hashlib.sha256(f"{os.path.basename(model_path)}\0{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.folder, f"{key}.wav")
 
-        command = [piper_executable, '--model', config.PIPER_VOICE_MODEL, '--output-file', raw_filename]
-        process = subprocess.Popen(command, stdin=subprocess.PIPE)
-        process.communicate(input=text_to_speak.encode('utf-8'))
+    def _check_out(self, path):
+        # Callers hold self._lock, so the entry cannot be evicted while it is linked
+        served = os.path.join(self.output_folder, f"{uuid.uuid4().hex}.wav")
+        try:
+            os.link(path, served)
+        except OSError:
+            shutil.copyfile(path, served)  # e.g. the folders are on different filesystems
+        return served
 
-        raw_audio = AudioSegment.from_file(raw_filename, format="raw", frame_rate=22050, channels=1, sample_width=2)
+    def _sweep_outputs(self):
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.output_ttl / 4
+        for entry in os.scandir(self.output_folder):
+            try:
+                if entry.stat().st_mtime < now - self.output_ttl:
+                    os.remove(entry.path)
+            except OSError:
+                pass
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as wav_file:
-            wav_filename = wav_file.name
+    def get(self, key):
+        """Returns a servable copy of the cached utterance, or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self.path_for(key)
+            try:
+                served = self._check_out(path)
+            except OSError:
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+        self._sweep_outputs()
+        return served
 
-        raw_audio.export(wav_filename, format="wav")
-        os.remove(raw_filename)
-        return wav_filename
+    def put(self, key, pcm, sample_rate):
+        """Caches the utterance and returns a servable copy of it."""
+        path = self.path_for(key)
+        with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as tmp:
+            try:
+                write_wav(tmp, pcm, sample_rate)
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+        os.replace(tmp.name, path)
+        with self._lock:
+            served = self._check_out(path)
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = os.path.getsize(path)
+            self._total_bytes += self._entries[key]
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    os.remove(self.path_for(old_key))
+                except OSError:
+                    pass
+        self._sweep_outputs()
+        return served
+
+_synthesizer = None
+_cache = None
+_init_lock = threading.Lock()
+
+def get_synthesizer():
+    global _synthesizer
+    with _init_lock:
+        if _synthesizer is None:
+            _synthesizer = PiperSynthesizer()
+        return _synthesizer
+
+def set_synthesizer(synthesizer):
+    """Replaces the shared synthesizer, e.g. with a fake in benchmarks."""
+    global _synthesizer
+    with _init_lock:
+        _synthesizer = synthesizer
+
+def get_tts_cache():
+    global _cache
+    with _init_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
+
+def text_to_speech_file(text_to_speak):
+    synthesizer = get_synthesizer()
+    cache = get_tts_cache()
+    key = TTSCache.key_for(getattr(synthesizer, "model_path", ""), text_to_speak)
+    cached_path = cache.get(key)
+    if cached_path:
+        return cached_path
+
+    print(f"AI generating audio for: {text_to_speak}")
+    try:
+        with stage_timer("tts_synthesis"):
+            pcm = synthesizer.synthesize(text_to_speak)
+        return cache.put(key, pcm, synthesizer.sample_rate)
     except Exception as e:
         print(f"An error occurred during TTS generation: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# --- Sentence-level streaming ---
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?:])\s+|\n+')
+
+def split_sentences(text, min_chars=config.TTS_MIN_SENTENCE_CHARS):
+    """Splits text into sentences, merging very short fragments into the following sentence."""
+    sentences, pending = [], ""
+    for piece in _SENTENCE_BREAK.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        pending = f"{pending} {piece}".strip()
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences and len(pending) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+def stream_speech_files(text, lookahead=config.TTS_STREAM_LOOKAHEAD):
+    """
+    Yields one WAV file path per sentence, in order. A background thread synthesizes
+    up to `lookahead` sentences ahead, so the first sentence can start playing while
+    the rest are still being generated.
+    """
+    ready = queue.Queue(maxsize=lookahead)
+    cancelled = threading.Event()
+    done = object()
+
+    def produce():
+        for sentence in split_sentences(text):
+            if cancelled.is_set():
+                return
+            ready.put(text_to_speech_file(sentence))
+        if not cancelled.is_set():
+            ready.put(done)
+
+    threading.Thread(target=produce, name="tts-stream", daemon=True).start()
+    try:
+        while True:
+            path = ready.get()
+            if path is done:
+                return
+            if path:
+                yield path
+    finally:
+        # Unblock the producer if the listener went away mid-utterance
+        cancelled.set()
+        while not ready.empty():
+            ready.get_nowait()
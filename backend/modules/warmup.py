@@ -0,0 +1,76 @@
+# modules/warmup.py
+import threading
+import time
+
+def _warm_llm():
+    from modules.llm_client import get_llm_client
+    get_llm_client()
+
+def _warm_jobs():
+    from modules.job_queue import get_job_queue
+    get_job_queue().warm_up()
+
+def _warm_docs():
+    import modules.doc_processor  # noqa: F401
+    import fitz  # noqa: F401
+    import docx  # noqa: F401
+
+def _warm_reports():
+    import modules.report_generator  # noqa: F401
+
+def _warm_stt():
+    from modules.stt_handler import get_stt_engine
+    get_stt_engine().warm_up()
+
+def _warm_tts():
+    from modules.tts_handler import get_synthesizer
+    get_synthesizer()
+
+COMPONENTS = {
+    'llm': _warm_llm,
+    'jobs': _warm_jobs,
+    'docs': _warm_docs,
+    'reports': _warm_reports,
+    'stt': _warm_stt,
+    'tts': _warm_tts,
+}
+
+_status = {}
+_status_lock = threading.Lock()
+
+def _run(components):
+    for name in components:
+        with _status_lock:
+            _status[name] = {'state': 'loading'}
+        started = time.perf_counter()
+        try:
+            COMPONENTS[name]()
+            result = {'state': 'ready'}
+        except Exception as e:
+            print(f"💥 Warm-up of '{name}' failed: {e}")
+            result = {'state': 'failed', 'error': str(e)}
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        with _status_lock:
+            _status[name] = result
+    print(f"🔥 Warm-up finished: {get_warmup_status()}")
+
+def start_warmup(components, delay=0.0):
+    """
+    Loads heavy dependencies and models in a background thread, so the server can
+    start listening first. Components already loading or loaded are skipped; failed
+    ones are tried again (e.g. once the model server they depend on is reachable).
+    """
+    with _status_lock:
+        pending = [name for name in components
+                   if name in COMPONENTS and _status.get(name, {}).get('state') in (None, 'failed')]
+        for name in pending:
+            _status[name] = {'state': 'queued'}
+    if pending:
+        timer = threading.Timer(delay, _run, args=(pending,))
+        timer.daemon = True
+        timer.start()
+    return pending
+
+def get_warmup_status():
+    with _status_lock:
+        return {name: dict(status) for name, status in _status.items()}
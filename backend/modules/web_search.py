@@ -1,30 +1,176 @@
 # modules/web_search.py
+import concurrent.futures
+import collections
+import threading
+import asyncio
+import random
+import time
+import regex as re
+import config
 
-from ddgs import DDGS
+# --- Providers ---
+# Each provider exposes a blocking `search(query, num_results)` returning a list of
+# {"title", "body", "href"} dicts.
+
+class DDGSSearchProvider:
+    name = "ddgs"
+
+    def __init__(self, timeout=config.SEARCH_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    def search(self, query, num_results):
+        from ddgs import DDGS
+        with DDGS(timeout=self.timeout) as ddgs:
+            return list(ddgs.text(query, max_results=num_results))
+
+class FakeSearchProvider:
+    """Local stand-in for tests and benchmarks. `latency` is seconds or a callable returning them."""
+    name = "fake"
+
+    def __init__(self, latency=0.0, results=None, failure_rate=0.0):
+        self.latency = latency
+        self.results = results
+        self.failure_rate = failure_rate
+
+    def search(self, query, num_results):
+        time.sleep(self.latency() if callable(self.latency) else self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Fake search failure")
+        if self.results is not None:
+            return self.results[:num_results]
+        return [{"title": f"Sample answer {i + 1}", "body": f"A strong answer to {query[:60]} uses a concrete example.",
+                 "href": f"https://example.com/{i}"} for i in range(num_results)]
+
+SEARCH_PROVIDERS = {"ddgs": DDGSSearchProvider, "fake": FakeSearchProvider}
+
+def _search_query(question):
+    # Refine the query to find expert answers
+    return f"expert sample answer for interview question: \"{question}\""
+
+def format_example_answers(results):
+    if not results:
+        return "No example answers found on the web."
+    return "".join(f"Example Answer Source {i+1}:\nTitle: {res.get('title', 'N/A')}\nSnippet: {res.get('body', 'N/A')}\n\n"
+                   for i, res in enumerate(results))
 
 def search_for_example_answers(query: str, num_results: int = 2):
     """
     Performs a targeted web search for high-quality example answers to an interview question.
+    Blocking and uncached; the interview flow goes through SearchEnricher instead.
     """
-    # Refine the query to find expert answers
-    search_query = f"expert sample answer for interview question: \"{query}\""
+    search_query = _search_query(query)
     print(f"🌐 Searching for expert answers with query: '{search_query}'")
-    
     try:
-        with DDGS(timeout=10) as ddgs:
-            results = list(ddgs.text(search_query, max_results=num_results))
-            
-            if not results:
-                print("   -> No example answers found.")
-                return "No example answers found on the web."
-            
-            formatted_results = ""
-            for i, res in enumerate(results):
-                formatted_results += f"Example Answer Source {i+1}:\nTitle: {res.get('title', 'N/A')}\nSnippet: {res.get('body', 'N/A')}\n\n"
-            
-            print(f"   -> Found {len(results)} example answers.")
-            return formatted_results
-            
+        results = DDGSSearchProvider().search(search_query, num_results)
+        print(f"   -> Found {len(results)} example answers.")
+        return format_example_answers(results)
     except Exception as e:
         print(f"💥 Web search failed: {e}")
-        return "Web search for example answers failed."
\ No newline at end of file
+        return "Web search for example answers failed."
+
+# --- Enrichment ---
+
+def normalize_question(question):
+    return re.sub(r"[^\w]+", " ", question.lower()).strip()
+
+class SearchEnricher:
+    """
+    Looks up example answers for interview questions in the background. Results are
+    cached per normalized question for `ttl` seconds (failed or empty lookups for
+    `negative_ttl`), concurrent lookups for the same question share one search, and
+    readers wait at most a latency budget, by default none: a result that is not ready
+    is skipped for that evaluation (and cached for the next one).
+    """
+
+    def __init__(self, provider, num_results=config.SEARCH_NUM_RESULTS, ttl=config.SEARCH_CACHE_TTL_SECONDS,
+                 max_entries=config.SEARCH_CACHE_MAX_ENTRIES, workers=config.SEARCH_WORKERS,
+                 negative_ttl=config.SEARCH_NEGATIVE_TTL_SECONDS):
+        self.provider = provider
+        self.num_results = num_results
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._cache = collections.OrderedDict()  # normalized question -> (expires_at, formatted text or None)
+        self._in_flight = {}  # normalized question -> Future
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="web-search")
+
+    def _cached(self, key):
+        # Callers hold self._lock. Returns the cache entry, whose text is None for a negative one
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry
+
+    def _lookup(self, key, question):
+        try:
+            results = self.provider.search(_search_query(question), self.num_results)
+            text = format_example_answers(results) if results else None
+        except Exception as e:
+            print(f"💥 Web search failed: {e}")
+            text = None
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._cache[key] = (time.time() + (self.ttl if text is not None else self.negative_ttl), text)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return text
+
+    def prefetch(self, question):
+        """Starts a lookup for the question unless it is cached or already running. Returns a Future."""
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._cached(key)
+            if entry is not None:
+                future = concurrent.futures.Future()
+                future.set_result(entry[1])
+                return future
+            if key not in self._in_flight:
+                self._in_flight[key] = self._executor.submit(self._lookup, key, question)
+            return self._in_flight[key]
+
+    def get(self, question, budget=config.SEARCH_LATENCY_BUDGET_SECONDS):
+        """Returns formatted example answers, or None if there are none within the budget."""
+        try:
+            return self.prefetch(question).result(timeout=budget)
+        except concurrent.futures.TimeoutError:
+            return None
+
+    async def aget(self, question, budget=config.SEARCH_LATENCY_BUDGET_SECONDS):
+        lookup = self.prefetch(question)
+        if lookup.done():
+            return lookup.result()
+        if budget <= 0:
+            return None
+        try:
+            # shield: a late lookup keeps running so its result is cached for next time
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(lookup)), budget)
+        except asyncio.TimeoutError:
+            return None
+
+_enricher = None
+_enricher_lock = threading.Lock()
+
+def get_search_enricher():
+    """Returns the shared enricher, or None when search enrichment is disabled."""
+    global _enricher
+    with _enricher_lock:
+        if _enricher is None and config.SEARCH_ENRICHMENT_ENABLED:
+            _enricher = SearchEnricher(SEARCH_PROVIDERS[config.SEARCH_PROVIDER]())
+        return _enricher
+
+def set_search_enricher(enricher):
+    """Replaces the shared enricher, e.g. with one wrapping FakeSearchProvider in tests."""
+    global _enricher
+    with _enricher_lock:
+        _enricher = enricher
+
+def prefetch_example_answers(question):
+    """Starts looking up example answers for a question that is about to be asked."""
+    enricher = get_search_enricher()
+    if enricher is not None and question and not question.startswith("Error"):
+        enricher.prefetch(question)